@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:01
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    """
+    Существующие статьи считаются изменёнными при публикации.
+    """
+    Article = apps.get_model("blogapp", "Article")
+    Article.objects.update(updated_at=F("pub_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0002_alter_article_author"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -39,6 +39,7 @@ class Article(models.Model):
     title = models.CharField(max_length=200, null=False, db_index=True)
     content = models.TextField(null=False)
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="articles")
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     tags = models.ManyToManyField(Tag, related_name='articles')
@@ -0,0 +1,19 @@
+"""
+Обработчики сигналов моделей блога.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from mysite19.cache_versions import bump_version
+
+from .models import Article
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_articles(sender, instance: Article, **kwargs) -> None:
+    """
+    Сбрасывает кэш ленты статей при изменении или удалении статьи.
+    """
+    bump_version("articles")
@@ -1,17 +1,9 @@
-from django.contrib.sitemaps import Sitemap
+from mysite19.sitemap_sections import SectionSitemap
 
 from .models import Article
 
 
-class BlogSitemap(Sitemap):
+class BlogSitemap(SectionSitemap):
+    model = Article
     changefreq = "never"
     priority = 0.5
-    def items(self):
-        return (Article.objects
-                .select_related("author", "category")
-                .prefetch_related("tags")
-                .defer("content")
-                .order_by("-pub_date")[:5])
-
-    def lastmod(self, obj: Article):
-        return obj.pub_date
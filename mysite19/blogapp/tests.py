@@ -1,2 +1,33 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
 
-# Create your tests here.
+from mysite19.smoke import URLSmokeTestMixin
+
+from . import urls
+from .models import Article, Author, Category, Tag
+
+
+class BlogURLsTestCase(URLSmokeTestMixin, TestCase):
+    urlconf = urls
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        cls.author = Author.objects.create(name="Author", bio="Bio")
+        tags = [Tag.objects.create(name=f"tag{index}") for index in range(3)]
+        cls.articles = []
+        for index in range(5):
+            article = Article.objects.create(
+                title=f"Article {index}",
+                content="Content",
+                author=cls.author,
+                category=Category.objects.create(name=f"Category {index}"),
+            )
+            article.tags.set(tags)
+            cls.articles.append(article)
+
+    def get_url_kwargs(self):
+        return {
+            "article_view": {"pk": self.articles[0].pk},
+            "author_view": {"pk": self.author.pk},
+        }
@@ -1,32 +1,38 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.syndication.views import Feed
+from django.db.models.functions import Left
 from django.http import Http404
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DetailView, ListView
 
+from mysite19.feeds import CachedFeed
+
 from .forms import ArticleForm, AuthorForm
 from .models import Article, Author, Category, Tag
 
 
-class LatestArticlesFeed(Feed):
+class LatestArticlesFeed(CachedFeed):
     title = "Blog articles (latest)"
     description = "Updates on changes and addition blog articles"
     link = reverse_lazy("blogapp:articles")
+    version_group = ("articles",)
+    items_count = settings.BLOG_FEED_ITEMS
 
     def items(self):
         return (Article.objects
-                .select_related("author", "category")
-                .prefetch_related("tags")
-                .defer("content")
-                .order_by("-pub_date")[:5])
+                .annotate(content_short=Left("content", 15))
+                .only("pk", "title", "pub_date")
+                .order_by("-pub_date")[:self.items_count])
 
     def item_title(self, item: Article):
         return item.title
 
     def item_description(self, item: Article):
-        return item.content[:15]
+        return item.content_short
 
+    def item_pubdate(self, item: Article):
+        return item.pub_date
 
 
 class ArticleListView(
@@ -0,0 +1,28 @@
+"""
+Настройки gunicorn.
+
+Метрики Prometheus (mysite19.metrics) в режиме нескольких процессов
+пишутся в файлы каталога PROMETHEUS_MULTIPROC_DIR. Каталог очищается
+при старте мастера, а файлы завершившегося процесса отмечаются, чтобы
+его счётчики не смешивались с новыми.
+"""
+
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+
+
+def on_starting(server):
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,2 +1,28 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
 
-# Create your tests here.
+from mysite19.smoke import URLSmokeTestMixin
+
+from . import urls
+from .models import Profile
+
+
+class MyAuthURLsTestCase(URLSmokeTestMixin, TestCase):
+    urlconf = urls
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        cls.profile = Profile.objects.create(user=cls.user, position="Admin")
+        for index in range(5):
+            Profile.objects.create(
+                user=User.objects.create_user(username=f"user{index}"),
+                position="Manager",
+            )
+
+    def get_url_kwargs(self):
+        profile = {"pk": self.profile.pk}
+        return {
+            "profile-detail": profile,
+            "staff-avatar-update": profile,
+        }
@@ -67,7 +67,7 @@ class ListProfilesView(ListView):
 
     template_name = "myauth/profiles-list.html"
     context_object_name = "profiles"
-    queryset = Profile.objects.all()
+    queryset = Profile.objects.select_related("user")
 
 
 class ProfileDetailView(DetailView):
@@ -0,0 +1,86 @@
+"""
+Поколенческая инвалидация кэша.
+
+Для каждой группы данных (например, "products" или "orders:<user_id>")
+в кэше хранится счётчик версии. Версия входит в ключ закэшированных
+данных, поэтому при изменении данных достаточно увеличить счётчик:
+старые записи перестают читаться и вытесняются по таймауту.
+
+Счётчик увеличивается после фиксации транзакции, в которой изменены
+данные. Иначе параллельный читатель мог бы получить новую версию,
+прочитать ещё не зафиксированные (старые) строки и сохранить их
+под новой версией до истечения таймаута.
+"""
+
+from functools import partial
+from time import time_ns
+from typing import Hashable, List, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY_PREFIX = "version"
+
+
+def version_key(*parts: Hashable) -> str:
+    """
+    Ключ счётчика версии для группы данных.
+    """
+    return ":".join(str(part) for part in (VERSION_KEY_PREFIX, *parts))
+
+
+def _initial_version() -> int:
+    """
+    Начальное значение счётчика.
+
+    Если счётчик вытеснили из кэша, новое значение не совпадёт
+    ни с одной из ранее выданных версий.
+    """
+    return time_ns() // 1000
+
+
+def get_version(*parts: Hashable) -> int:
+    """
+    Текущая версия группы данных.
+    """
+    key = version_key(*parts)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*groups: Tuple[Hashable, ...]) -> List[int]:
+    """
+    Версии нескольких групп данных за одно обращение к кэшу.
+
+    Args:
+        groups: Кортежи частей ключа, например ("products",).
+
+    Returns:
+        Версии в порядке перечисления групп.
+    """
+    keys = [version_key(*group) for group in groups]
+    found = cache.get_many(keys)
+    return [
+        found[key] if key in found else get_version(*group)
+        for key, group in zip(keys, groups)
+    ]
+
+
+def bump_version(*parts: Hashable) -> None:
+    """
+    Увеличивает версию группы данных, делая её кэш устаревшим.
+
+    Вызывается после изменения данных; внутри транзакции счётчик
+    увеличивается после её фиксации, вне транзакции - сразу.
+    """
+    transaction.on_commit(partial(_increment_version, version_key(*parts)))
+
+
+def _increment_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
@@ -0,0 +1,84 @@
+"""
+RSS-ленты с кэшированием готового ответа.
+
+Лента рендерится один раз на версию данных (см. cache_versions):
+запись кэша хранит XML, версию, для которой он построен, и валидаторы.
+Версия и запись читаются одним обращением к кэшу, поэтому частые
+опросы читателей лент не обращаются к базе, а неизменённые опросы
+получают 304 по ETag / If-Modified-Since.
+"""
+
+from typing import Hashable, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from django.utils.translation import get_language
+
+from shop.conditional import conditional, make_etag
+
+from .cache_versions import get_version, version_key
+
+
+class CachedFeed(Feed):
+    """
+    Лента, закэшированная до смены версии группы данных.
+
+    Подклассы задают version_group - группу, версию которой
+    увеличивают сигналы при изменении данных ленты, и items_count.
+    """
+
+    version_group: Tuple[Hashable, ...] = ()
+    items_count = 5
+
+    def __call__(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        key = self.get_cache_key(request)
+        version, entry = self.get_cached_entry(key)
+        if entry is None:
+            response = super().__call__(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = {
+                "version": version,
+                "content": response.content,
+                "content_type": response["Content-Type"],
+                "etag": make_etag(version, key),
+                "last_modified": timezone.now().replace(microsecond=0),
+            }
+            cache.set(key, entry, timeout=settings.FEED_CACHE_TIMEOUT)
+        return conditional(
+            request,
+            (entry["etag"], entry["last_modified"]),
+            lambda: HttpResponse(
+                entry["content"], content_type=entry["content_type"]
+            ),
+        )
+
+    def get_cache_key(self, request: HttpRequest) -> str:
+        # Ссылки ленты абсолютные и с префиксом языка.
+        return ":".join((
+            "feed",
+            type(self).__name__,
+            str(self.items_count),
+            get_language(),
+            request.get_host(),
+        ))
+
+    def get_cached_entry(self, key: str) -> Tuple[int, Optional[dict]]:
+        """
+        Запись ленты, если она построена для текущей версии данных.
+
+        Returns:
+            Текущая версия и запись ленты или None.
+        """
+        group_key = version_key(*self.version_group)
+        found = cache.get_many([group_key, key])
+        version = found.get(group_key)
+        if version is None:
+            return get_version(*self.version_group), None
+        entry = found.get(key)
+        if entry is None or entry["version"] != version:
+            return version, None
+        return version, entry
@@ -0,0 +1,196 @@
+"""
+Метрики запросов в формате Prometheus.
+
+MetricsMiddleware для каждого запроса записывает в гистограммы
+с меткой маршрута (имя URL, например "shop:product_details"):
+длительность ответа, число и суммарное время SQL-запросов
+(connection.execute_wrapper) и число попаданий и промахов кэша.
+Попадания считает бэкенд кэша с CacheMetricsMixin
+(InstrumentedRedisCache в настройках).
+
+Метрики отдаёт представление metrics_view (/metrics). Под gunicorn
+с несколькими процессами каждый процесс пишет метрики в файлы
+каталога PROMETHEUS_MULTIPROC_DIR, а представление собирает их
+вместе (см. gunicorn.conf.py).
+"""
+
+import os
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django_redis.cache import RedisCache
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+UNRESOLVED_ROUTE = "<unresolved>"
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "HTTP requests by route, method and status.",
+    ["route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Request latency by route.",
+    ["route", "method"],
+)
+SQL_QUERIES = Histogram(
+    "django_http_request_sql_queries",
+    "SQL queries per request by route.",
+    ["route"],
+    buckets=COUNT_BUCKETS,
+)
+SQL_DURATION = Histogram(
+    "django_http_request_sql_duration_seconds",
+    "Total SQL time per request by route.",
+    ["route"],
+)
+CACHE_LOOKUPS = Histogram(
+    "django_http_request_cache_lookups",
+    "Cache hits and misses per request by route.",
+    ["route", "result"],
+    buckets=COUNT_BUCKETS,
+)
+
+
+@dataclass
+class RequestStats:
+    sql_queries: int = 0
+    sql_duration: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+class QueryTimer:
+    """
+    Обёртка execute_wrapper: считает запросы и их время.
+    """
+
+    def __init__(self, stats: RequestStats) -> None:
+        self.stats = stats
+
+    def __call__(
+            self, execute: Callable, sql: str, params: Any, many: bool,
+            context: Dict[str, Any],
+    ) -> Any:
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.sql_queries += 1
+            self.stats.sql_duration += perf_counter() - start
+
+
+def record_cache_lookups(hits: int, misses: int) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """
+    Бэкенд кэша, который отмечает попадания и промахи get/get_many
+    в метриках текущего запроса.
+    """
+
+    def get(self, key: str, default: Any = None, version=None, **kwargs):
+        value = super().get(key, _MISSING, version, **kwargs)
+        if value is _MISSING:
+            record_cache_lookups(0, 1)
+            return default
+        record_cache_lookups(1, 0)
+        return value
+
+    def get_many(self, keys: Iterable[str], version=None, **kwargs) -> dict:
+        keys = list(keys)
+        found = super().get_many(keys, version=version, **kwargs)
+        record_cache_lookups(len(found), len(keys) - len(found))
+        return found
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    pass
+
+
+def route_name(request: HttpRequest) -> str:
+    """
+    Метка маршрута: имя URL, не путь, чтобы число рядов не росло
+    с числом объектов и языков.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    return match.view_name
+
+
+class MetricsMiddleware:
+    """
+    Записывает метрики каждого запроса (см. модуль).
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                timer = QueryTimer(stats)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        duration = perf_counter() - start
+
+        route = route_name(request)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        REQUEST_LATENCY.labels(route, request.method).observe(duration)
+        SQL_QUERIES.labels(route).observe(stats.sql_queries)
+        SQL_DURATION.labels(route).observe(stats.sql_duration)
+        CACHE_LOOKUPS.labels(route, "hit").observe(stats.cache_hits)
+        CACHE_LOOKUPS.labels(route, "miss").observe(stats.cache_misses)
+        return response
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Метрики для Prometheus.
+
+    Запрос должен передать METRICS_TOKEN в заголовке
+    Authorization: Bearer <token>. Без токена в настройках метрики
+    отдаются только в режиме отладки.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,148 @@
+"""
+Обнаружение N+1 запросов.
+
+Каждый SQL-запрос приводится к форме (query_shape): литералы
+и списки IN (%s, ...) заменяются заполнителями. Если за один запрос
+к сайту форма повторилась NPLUSONE_THRESHOLD раз, это почти всегда
+цикл по объектам без select_related/prefetch_related. Сообщение
+содержит место, откуда выполнен запрос: строку кода проекта или
+строку шаблона.
+
+NPlusOneMiddleware включается настройкой NPLUSONE_ENABLED
+(по умолчанию в режиме отладки) и пишет предупреждение в лог,
+а при NPLUSONE_RAISE=True (тесты) выбрасывает NPlusOneError.
+Вне запросов проверку включает контекстный менеджер
+detect_n_plus_one().
+"""
+
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from loguru import logger
+
+# Кадры этих модулей не считаются местом выполнения запроса.
+IGNORED_MODULES = ("mysite19.nplusone", "mysite19.metrics")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def query_shape(sql: str) -> str:
+    """
+    Форма запроса: одинакова для запросов, различающихся
+    только значениями параметров.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def query_origin() -> str:
+    """
+    Ближайшее к запросу место в коде проекта или в шаблоне.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "render_annotated":
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None and token is not None:
+                return f"{origin.template_name}, line {token.lineno}"
+        elif (
+                code.co_filename.startswith(base_dir)
+                and "site-packages" not in code.co_filename
+                and frame.f_globals.get("__name__") not in IGNORED_MODULES
+        ):
+            return (
+                f"{code.co_filename}, line {frame.f_lineno},"
+                f" in {code.co_name}"
+            )
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class QueryShapeCounter:
+    """
+    Обёртка execute_wrapper: считает формы запросов и сообщает
+    о каждой форме, повторившейся threshold раз.
+    """
+
+    def __init__(self, threshold: int, raise_error: bool) -> None:
+        self.threshold = threshold
+        self.raise_error = raise_error
+        self.counts: Counter = Counter()
+
+    def __call__(
+            self, execute: Callable, sql: str, params: Any, many: bool,
+            context: Dict[str, Any],
+    ) -> Any:
+        result = execute(sql, params, many, context)
+        shape = query_shape(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold:
+            self.report(shape)
+        return result
+
+    def report(self, shape: str) -> None:
+        message = (
+            f"N+1: запрос выполнен {self.threshold} раз"
+            f" из {query_origin()}: {shape}"
+        )
+        if self.raise_error:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+@contextmanager
+def detect_n_plus_one(
+        threshold: Optional[int] = None, raise_error: Optional[bool] = None
+) -> Iterator[QueryShapeCounter]:
+    """
+    Проверяет запросы к базе внутри блока.
+
+    Args:
+        threshold: Число повторов формы, по умолчанию NPLUSONE_THRESHOLD.
+        raise_error: Выбрасывать NPlusOneError вместо записи в лог,
+            по умолчанию NPLUSONE_RAISE.
+    """
+    counter = QueryShapeCounter(
+        threshold or settings.NPLUSONE_THRESHOLD,
+        settings.NPLUSONE_RAISE if raise_error is None else raise_error,
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+class NPlusOneMiddleware:
+    """
+    Проверяет каждый запрос к сайту, если NPLUSONE_ENABLED.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not settings.NPLUSONE_ENABLED:
+            return self.get_response(request)
+        # TemplateResponse рендерится обработчиком до возврата сюда,
+        # поэтому запросы из шаблонов тоже попадают в проверку.
+        with detect_n_plus_one():
+            return self.get_response(request)
@@ -42,8 +42,10 @@ if not SECRET_KEY:
 DEBUG = os.getenv("DJANGO_DEBUG", "0") == "1"
 
 allowed_hosts_env = os.getenv("DJANGO_ALLOWED_HOSTS", "")
+# "app" - имя сервиса в docker-compose, по нему Prometheus
+# запрашивает /metrics.
 ALLOWED_HOSTS = [
-                    "0.0.0.0", "127.0.0.1", "localhost"
+                    "0.0.0.0", "127.0.0.1", "localhost", "app"
                 ] + [
     h for h in allowed_hosts_env.split(",") if h
 ]
@@ -68,6 +70,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "rest_framework",
     "drf_spectacular",
@@ -84,6 +87,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # "django.middleware.cache.UpdateCacheMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "mysite19.metrics.MetricsMiddleware",
+    "mysite19.nplusone.NPlusOneMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -158,7 +163,8 @@ DATABASES = {
 redis_url = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1")
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        # RedisCache, считающий попадания для метрик (mysite19.metrics).
+        'BACKEND': 'mysite19.metrics.InstrumentedRedisCache',
         'LOCATION': redis_url,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -167,6 +173,49 @@ CACHES = {
     },
 }
 
+# Время жизни версионированного кэша экспорта: записи сбрасываются
+# сменой версии (shop.signals), таймаут лишь вытесняет старые версии.
+SHOP_EXPORT_CACHE_TIMEOUT = 60 * 60 * 24
+# Время жизни кэша представлений товаров (shop.product_cache): записи
+# обновляются сигналами, таймаут лишь вытесняет редко читаемые товары.
+SHOP_PRODUCT_CACHE_TIMEOUT = 60 * 60 * 24
+# Время жизни кэша страниц списка товаров; устаревают сменой версии.
+SHOP_PRODUCT_LIST_CACHE_TIMEOUT = 60 * 60
+# Время жизни кэша HTML-фрагментов (shop.fragments); версия объекта
+# входит в ключ, таймаут лишь вытесняет старые версии.
+SHOP_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Время жизни кэша RSS-лент (mysite19.feeds); устаревают сменой версии.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Количество записей в RSS-лентах товаров и статей.
+SHOP_FEED_ITEMS = int(os.getenv("SHOP_FEED_ITEMS", 5))
+BLOG_FEED_ITEMS = int(os.getenv("BLOG_FEED_ITEMS", 5))
+# Ширины уменьшенных копий изображений товаров (shop.thumbnails)
+# и число процессов, которые их строят.
+SHOP_THUMBNAIL_WIDTHS = (160, 320, 640, 1280)
+SHOP_THUMBNAIL_WORKERS = int(os.getenv("SHOP_THUMBNAIL_WORKERS", 2))
+# Начиная с этой оценки количества строк списки админки не выполняют
+# точный COUNT(*) (shop.admin_mixins.EstimatedCountPaginator).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+# Токен доступа к /metrics (mysite19.metrics). Без токена метрики
+# открыты только в режиме отладки.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Обнаружение N+1 запросов (mysite19.nplusone): по умолчанию в отладке,
+# в тестах с NPLUSONE_RAISE=True.
+NPLUSONE_ENABLED = os.getenv("NPLUSONE_ENABLED", "1" if DEBUG else "0") == "1"
+NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", 5))
+NPLUSONE_RAISE = False
+# Время жизни кэша результатов поиска по префиксу (shop.autocomplete)
+# и минимальная длина префикса.
+SHOP_AUTOCOMPLETE_CACHE_TIMEOUT = 60
+SHOP_AUTOCOMPLETE_MIN_LENGTH = 2
+# Окно пересчёта витрин продаж до отметки, секунды (см. shop.rollups).
+SHOP_SALES_ROLLUP_LOOKBACK = 60 * 60 * 24
+# Задача импорта, воркер которой не сообщал о прогрессе дольше
+# SHOP_IMPORT_JOB_LEASE секунд, возвращается в очередь
+# не больше SHOP_IMPORT_JOB_MAX_ATTEMPTS раз (см. shop.jobs).
+SHOP_IMPORT_JOB_LEASE = 60 * 5
+SHOP_IMPORT_JOB_MAX_ATTEMPTS = 3
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -218,6 +267,11 @@ LOGIN_URL = reverse_lazy("myauth:login")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "uploads"
 
+# Предварительно отрендеренные карты сайта (команда render_sitemaps).
+SITEMAP_ROOT = MEDIA_ROOT / "sitemaps"
+SITEMAP_SECTION_SIZE = 10_000
+SITEMAP_BASE_URL = os.getenv("SITEMAP_BASE_URL", "http://localhost:8000")
+
 # LOGFILE_PATH = BASE_DIR / "logs_dir" / "log.log"
 # LOGFILE_PATH.parent.mkdir(parents=True, exist_ok=True)
 LOGLEVEL = os.getenv("LOGLEVEL", "INFO").upper()
@@ -276,6 +330,10 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Конфигурация полнотекстового поиска PostgreSQL для товаров.
+# "russian" стеммит русские слова, латиницу обрабатывает english_stem.
+SHOP_SEARCH_CONFIG = "russian"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "My Site Project API",
     "DESCRIPTION": "Site shop and custom auth",
@@ -298,6 +356,8 @@ PASSWORD_HASHERS = [
 # Безопасность для продакшн
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
+    # Prometheus обращается к приложению внутри сети docker по HTTP.
+    SECURE_REDIRECT_EXEMPT = [r"^metrics$"]
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_HSTS_SECONDS = 3600
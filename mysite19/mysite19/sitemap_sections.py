@@ -0,0 +1,77 @@
+"""
+Секционированные карты сайта.
+
+Объекты разбиваются на секции по фиксированным диапазонам pk
+(секция N - pk из (N * size, (N + 1) * size]), поэтому изменение
+объекта затрагивает ровно одну секцию, а границы секций
+не сдвигаются при удалениях. Секции рендерятся в файлы командой
+render_sitemaps (см. mysite19.sitemaps).
+"""
+
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Type
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import (Count, ExpressionWrapper, F, IntegerField, Max,
+                              Model, QuerySet)
+
+SectionSignature = Tuple[datetime, int]
+
+
+class SectionSitemap(Sitemap):
+    """
+    Карта сайта одной секции.
+
+    Подклассы задают model - модель с полем updated_at. Если
+    публикуются не все объекты, get_queryset() сужает выборку.
+    """
+
+    model: Optional[Type[Model]] = None
+    section_size = settings.SITEMAP_SECTION_SIZE
+
+    def __init__(self, section: int) -> None:
+        self.section = section
+
+    @property
+    def limit(self) -> int:
+        return self.section_size
+
+    def get_queryset(self) -> QuerySet:
+        if self.model is None:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} is missing the model attribute."
+            )
+        return self.model._default_manager.only("pk", "updated_at")
+
+    def items(self) -> QuerySet:
+        start = self.section * self.section_size
+        return (
+            self.get_queryset()
+            .filter(pk__gt=start, pk__lte=start + self.section_size)
+            .order_by("pk")
+        )
+
+    def lastmod(self, obj) -> datetime:
+        return obj.updated_at
+
+    @classmethod
+    def signatures(cls) -> Dict[int, SectionSignature]:
+        """
+        Последнее изменение и количество объектов по секциям
+        одним запросом с группировкой.
+        """
+        section = ExpressionWrapper(
+            (F("pk") - 1) / cls.section_size, output_field=IntegerField()
+        )
+        rows = (
+            cls(0).get_queryset()
+            .annotate(section=section)
+            .values("section")
+            .annotate(lastmod=Max("updated_at"), count=Count("pk"))
+            .order_by()
+        )
+        return {
+            row["section"]: (row["lastmod"], row["count"]) for row in rows
+        }
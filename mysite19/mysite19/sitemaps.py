@@ -1,7 +1,147 @@
+"""
+Индекс карт сайта, собранный из предварительно отрендеренных секций.
+
+Команда render_sitemaps пересчитывает подписи секций (последнее
+изменение и количество объектов) и перерисовывает в SITEMAP_ROOT
+только изменившиеся секции. Представления отдают готовые файлы,
+поэтому запросы поисковых роботов не обращаются к базе.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Type
+
+from django.conf import settings
+from django.contrib.sitemaps.views import SitemapIndexItem
+from django.http import FileResponse, Http404, HttpRequest
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.http import http_date
+from loguru import logger
+
 from blogapp.sitemap import BlogSitemap
 from shop.sitemap import ShopSitemap
 
-sitemaps = {
+from .sitemap_sections import SectionSitemap
+
+sitemaps: Dict[str, Type[SectionSitemap]] = {
     "blog": BlogSitemap,
     "shop": ShopSitemap,
-}
\ No newline at end of file
+}
+
+INDEX_FILE = "sitemap.xml"
+MANIFEST_FILE = "manifest.json"
+
+
+class BaseUrlSite:
+    """
+    Сайт для Sitemap.get_urls() вне запроса.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self.protocol, _, self.domain = base_url.rstrip("/").partition("://")
+
+
+def section_file(name: str, section: int) -> str:
+    return f"sitemap-{name}-{section}.xml"
+
+
+def write_file(path: Path, content: str) -> None:
+    """
+    Атомарная запись: читатель видит старый или новый файл целиком.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def render_sitemaps(force: bool = False) -> dict:
+    """
+    Перерисовывает изменившиеся секции, индекс и манифест.
+
+    Args:
+        force: Перерисовать все секции.
+
+    Returns:
+        Итоги: rendered, removed, unchanged (количество секций).
+    """
+    root = Path(settings.SITEMAP_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest_path = root / MANIFEST_FILE
+    manifest = {}
+    if manifest_path.exists() and not force:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    site = BaseUrlSite(settings.SITEMAP_BASE_URL)
+    summary = {"rendered": 0, "removed": 0, "unchanged": 0}
+    new_manifest = {}
+    index = []
+    language = translation.get_supported_language_variant(
+        settings.LANGUAGE_CODE
+    )
+    with translation.override(language):
+        for name, sitemap_class in sitemaps.items():
+            previous = manifest.get(name, {})
+            current = {
+                str(section): [lastmod.isoformat(), count]
+                for section, (lastmod, count)
+                in sorted(sitemap_class.signatures().items())
+            }
+            for section, signature in current.items():
+                filename = section_file(name, int(section))
+                unchanged = previous.get(section) == signature
+                if unchanged and (root / filename).exists():
+                    summary["unchanged"] += 1
+                else:
+                    sitemap = sitemap_class(int(section))
+                    urls = sitemap.get_urls(site=site, protocol=site.protocol)
+                    write_file(
+                        root / filename,
+                        render_to_string("sitemap.xml", {"urlset": urls}),
+                    )
+                    summary["rendered"] += 1
+                index.append(SitemapIndexItem(
+                    f"{settings.SITEMAP_BASE_URL.rstrip('/')}/{filename}",
+                    datetime.fromisoformat(signature[0]),
+                ))
+            for section in set(previous) - set(current):
+                (root / section_file(name, int(section))).unlink(
+                    missing_ok=True
+                )
+                summary["removed"] += 1
+            new_manifest[name] = current
+
+    write_file(
+        root / INDEX_FILE,
+        render_to_string("sitemap_index.xml", {"sitemaps": index}),
+    )
+    write_file(manifest_path, json.dumps(new_manifest))
+    logger.info(f"Карты сайта обновлены: {summary}")
+    return summary
+
+
+def serve_sitemap_file(filename: str) -> FileResponse:
+    path = Path(settings.SITEMAP_ROOT) / filename
+    try:
+        file = path.open("rb")
+    except FileNotFoundError:
+        logger.warning(f"Нет файла карты сайта {filename}")
+        raise Http404("Sitemap is not rendered yet")
+    response = FileResponse(file, content_type="application/xml")
+    modified = os.fstat(file.fileno()).st_mtime
+    response.headers["Last-Modified"] = http_date(modified)
+    return response
+
+
+def sitemap_index(request: HttpRequest) -> FileResponse:
+    return serve_sitemap_file(INDEX_FILE)
+
+
+def sitemap_section(
+        request: HttpRequest, name: str, section: int
+) -> FileResponse:
+    if name not in sitemaps:
+        raise Http404("Unknown sitemap")
+    return serve_sitemap_file(section_file(name, section))
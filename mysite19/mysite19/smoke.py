@@ -0,0 +1,76 @@
+"""
+Проверка адресов приложения под детектором N+1 (mysite19.nplusone).
+
+Используется в tests.py приложений: URLSmokeTestMixin открывает
+каждый именованный адрес urlconf приложения, включая адреса роутеров
+API, и падает на ошибке сервера или на повторяющемся запросе.
+"""
+
+from typing import Dict, Iterable, Iterator
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import URLResolver, reverse
+from django.utils import translation
+
+
+def iter_url_names(patterns: Iterable) -> Iterator[str]:
+    """
+    Имена адресов, включая вложенные через include().
+    """
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+class URLSmokeTestMixin:
+    """
+    Примесь к TestCase: GET каждого адреса urlconf.
+
+    Данные создаются в setUpTestData так, чтобы списков было больше
+    nplusone_threshold объектов. Параметры адресов возвращает
+    get_url_kwargs(), запросы выполняются от имени get_user():
+    по умолчанию это self.user или новый суперпользователь.
+    """
+
+    urlconf = None
+    user = None
+    nplusone_threshold = 3
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.enterContext(override_settings(
+            NPLUSONE_ENABLED=True,
+            NPLUSONE_RAISE=True,
+            NPLUSONE_THRESHOLD=self.nplusone_threshold,
+        ))
+        # Префикс языка в адресах shop и myauth (i18n_patterns).
+        self.enterContext(translation.override("en"))
+
+    def get_user(self):
+        if self.user is None:
+            self.user = get_user_model().objects.create_superuser(
+                username="smoke"
+            )
+        return self.user
+
+    def get_url_kwargs(self) -> Dict[str, dict]:
+        return {}
+
+    def test_every_url(self) -> None:
+        namespace = self.urlconf.app_name
+        url_kwargs = self.get_url_kwargs()
+        for name in sorted(set(iter_url_names(self.urlconf.urlpatterns))):
+            with self.subTest(url=name):
+                # Адрес выхода завершает сессию, поэтому вход перед каждым.
+                self.client.force_login(self.get_user())
+                url = reverse(
+                    f"{namespace}:{name}", kwargs=url_kwargs.get(name)
+                )
+                response = self.client.get(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                self.assertLess(response.status_code, 500, url)
+                self.assertNotEqual(response.status_code, 404, url)
@@ -0,0 +1,23 @@
+from django.test import TestCase, override_settings
+
+
+@override_settings(DEBUG=False, SECURE_SSL_REDIRECT=True)
+class MetricsViewTestCase(TestCase):
+    def get(self, **headers):
+        return self.client.get("/metrics", HTTP_HOST="app", **headers)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_closed_without_token(self):
+        self.assertEqual(self.get().status_code, 403)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requires_token(self):
+        self.assertEqual(self.get().status_code, 401)
+        response = self.get(HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_scrape_over_http(self):
+        response = self.get(HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"django_http_requests_total", response.content)
@@ -19,12 +19,12 @@ from django.conf import settings
 from django.conf.urls.i18n import i18n_patterns
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.contrib.sitemaps.views import sitemap
 from django.urls import include, path
 from drf_spectacular.views import (SpectacularAPIView, SpectacularRedocView,
                                    SpectacularSwaggerView)
 
-from .sitemaps import sitemaps
+from .metrics import metrics_view
+from .sitemaps import sitemap_index, sitemap_section
 
 urlpatterns = [
     path("admin/doc/", include("django.contrib.admindocs.urls")),
@@ -34,12 +34,17 @@ urlpatterns = [
     path("api/schema/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
     path("api/", include("myapi.urls")),
     path("blog/", include("blogapp.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path(
         "sitemap.xml",
-        sitemap,
-        {"sitemaps": sitemaps},
+        sitemap_index,
         name="django.contrib.sitemaps.views",
     ),
+    path(
+        "sitemap-<slug:name>-<int:section>.xml",
+        sitemap_section,
+        name="sitemap_section",
+    ),
 ]
 
 urlpatterns += i18n_patterns(
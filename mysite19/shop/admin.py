@@ -2,14 +2,27 @@
 
 from django.contrib import admin
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import redirect, render
-from django.urls import path
-
-from .admin_mixins import ExportAsCSVMixin
-from .common import save_csv_orders, save_csv_products
-from .forms import CSVImportForm
-from .models import Order, Product, ProductImage
+from django.db.models.functions import Left
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
+
+from mysite19.cache_versions import bump_version
+
+from .admin_mixins import (LargeTableAdminMixin, PaginatedInlineMixin,
+                           PaginatedInlinesAdminMixin, StreamingExportMixin,
+                           group_related_ids)
+from .forms import CSVImportForm, ProductCSVImportForm
+from .jobs import enqueue_import
+from .models import ImportJob, Order, Product, ProductImage
+from .product_cache import evict_products
+from .search import (full_text_search_available, search_orders,
+                     search_products)
+from .signals import bump_order_versions
+from .totals import refresh_order_totals
 
 
 class ProductImageInLine(admin.StackedInline):
@@ -20,12 +33,14 @@ class ProductImageInLine(admin.StackedInline):
     model = ProductImage
 
 
-class OrderInline(admin.TabularInline):
+class OrderInline(PaginatedInlineMixin, admin.TabularInline):
     """
     Inline для отображения связей заказов с продуктами в табличном виде.
     """
 
     model = Product.orders.through
+    autocomplete_fields = ("order",)
+    extra = 1
 
 
 @admin.action(description="Archive products")
@@ -40,7 +55,9 @@ def mark_archived(
         request: HTTP-запрос.
         queryset: Выбранные объекты для действия.
     """
-    queryset.update(archived=True)
+    evict_products(list(queryset.values_list("pk", flat=True)))
+    queryset.update(archived=True, updated_at=timezone.now())
+    bump_version("products")
 
 
 @admin.action(description="Unarchive products")
@@ -55,12 +72,17 @@ def mark_unarchived(
         request: HTTP-запрос.
         queryset: Выбранные объекты для действия.
     """
-    queryset.update(archived=False)
+    evict_products(list(queryset.values_list("pk", flat=True)))
+    queryset.update(archived=False, updated_at=timezone.now())
+    bump_version("products")
 
 
 @admin.register(Product)
 class ProductAdmin(
-    admin.ModelAdmin, ExportAsCSVMixin
+    LargeTableAdminMixin,
+    PaginatedInlinesAdminMixin,
+    StreamingExportMixin,
+    admin.ModelAdmin,
 ):
     """
     Админ-класс для модели Product с настройками
@@ -71,7 +93,21 @@ class ProductAdmin(
         mark_archived,
         mark_unarchived,
         "export_csv",
+        "export_ndjson",
     ]
+    export_columns = {
+        "pk": "pk",
+        "sku": "sku",
+        "name": "name",
+        "description": "description",
+        "price": "price",
+        "discount": "discount",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+        "created_by": "created_by__username",
+        "archived": "archived",
+        "preview": "preview",
+    }
     inlines = [
         OrderInline,
         ProductImageInLine,
@@ -84,13 +120,14 @@ class ProductAdmin(
                     "discount",
                     "archived")
     list_display_links = "pk", "name"
+    list_defer = ("description", "search_vector")
     ordering = "-name", "pk"
     search_fields = "name", "description"
     fieldsets = [
         (
             None,
             {
-                "fields": ("name", "description"),
+                "fields": ("name", "sku", "description"),
             },
         ),
         (
@@ -117,6 +154,27 @@ class ProductAdmin(
         ),
     ]
 
+    def get_search_results(
+            self, request: HttpRequest, queryset: QuerySet, search_term: str
+    ):
+        """
+        Поиск в списке товаров через полнотекстовый индекс.
+
+        Без PostgreSQL используется стандартный поиск по search_fields.
+        """
+        if not search_term or not full_text_search_available():
+            return super().get_search_results(request, queryset, search_term)
+        return search_products(queryset, search_term), False
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        """
+        Начало описания для списка читается из базы вместо
+        всего описания (см. list_defer).
+        """
+        return super().get_queryset(request).annotate(
+            description_prefix=Left("description", 49)
+        )
+
     def description_short(self, obj: Product) -> str:
         """
         Возвращает укороченное описание продукта (до 48 символов).
@@ -127,18 +185,44 @@ class ProductAdmin(
         Returns:
             Краткое описание с многоточием, если длиннее 48 символов.
         """
-        if len(obj.description) < 48:
-            return obj.description
-        return obj.description[:48] + "..."
+        if len(obj.description_prefix) < 48:
+            return obj.description_prefix
+        return obj.description_prefix[:48] + "..."
+
+    def save_formset(
+            self, request: HttpRequest, form, formset, change: bool
+    ) -> None:
+        """
+        После сохранения строк OrderInline пересчитывает итоги
+        затронутых заказов: строки таблицы связи сохраняются
+        без сигнала m2m_changed.
+        """
+        if formset.model is not Order.products.through:
+            return super().save_formset(request, form, formset, change)
+        order_ids = set()
+        for inline_form in formset.forms:
+            deleted = inline_form in formset.deleted_forms
+            if deleted or inline_form.has_changed():
+                order = inline_form.cleaned_data.get("order")
+                order_ids.add(inline_form.initial.get("order"))
+                order_ids.add(order.pk if order else None)
+        order_ids.discard(None)
+        super().save_formset(request, form, formset, change)
+        if order_ids:
+            orders = Order.objects.filter(pk__in=order_ids)
+            refresh_order_totals(orders)
+            bump_order_versions(
+                *orders.values_list("user_id", flat=True)
+            )
 
     def import_csv(self, request: HttpRequest) -> HttpResponse:
         if request.method == "GET":
-            form = CSVImportForm()
+            form = ProductCSVImportForm()
             context = {
                 "form": form,
             }
             return render(request, "admin/csv_form.html", context=context)
-        form = CSVImportForm(request.POST, request.FILES)
+        form = ProductCSVImportForm(request.POST, request.FILES)
         if not form.is_valid():
             context = {
                 "form": form,
@@ -149,13 +233,15 @@ class ProductAdmin(
                 context=context,
                 status=400
             )
-        save_csv_products(
+        job = enqueue_import(
+            ImportJob.Kind.PRODUCTS,
             file=form.cleaned_data["csv_file"],
             encoding=request.encoding,
             user=request.user,
+            upsert=form.cleaned_data["upsert"],
         )
-        self.message_user(request, "Data from CSV was imported.")
-        return redirect("..")
+        self.message_user(request, "CSV import was queued.")
+        return redirect("admin:shop_importjob_change", job.pk)
 
     def get_urls(self):
         urls = super().get_urls()
@@ -169,28 +255,54 @@ class ProductAdmin(
         return new_urls + urls
 
 
-class ProductInline(admin.StackedInline):
+class ProductInline(PaginatedInlineMixin, admin.TabularInline):
     """
     Inline для отображения связей продуктов с заказами в админке.
     """
 
     model = Order.products.through
+    autocomplete_fields = ("product",)
+    extra = 1
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(
+    LargeTableAdminMixin,
+    PaginatedInlinesAdminMixin,
+    StreamingExportMixin,
+    admin.ModelAdmin,
+):
     """
     Админ-класс для модели Order с настройками
     отображения и оптимизацией запросов.
     """
     change_list_template = "shop/orders_change_list.html"
+    export_columns = {
+        "pk": "pk",
+        "delivery_address": "delivery_address",
+        "promo_code": "promo_code",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+        "user": "user__username",
+        "total_price": "total_price",
+        "products_count": "products_count",
+    }
+    export_related = ("products",)
     inlines = [
         ProductInline,
     ]
     list_display = ("delivery_address",
                     "promo_code",
                     "created_at",
+                    "products_count",
+                    "total_price",
                     "user_verbose")
+    search_fields = ("delivery_address",)
+    # Автодополнению нужен детерминированный порядок.
+    ordering = ("-pk",)
+    # Состав заказа редактируется постраничным ProductInline.
+    exclude = ("products",)
+    raw_id_fields = ("user",)
 
     def get_queryset(self, request: HttpRequest) -> QuerySet:
         """
@@ -202,9 +314,38 @@ class OrderAdmin(admin.ModelAdmin):
         Returns:
             Оптимизированный queryset заказов.
         """
-        return (Order.objects
-                .select_related("user")
-                .prefetch_related("products"))
+        return super().get_queryset(request).select_related("user")
+
+    def get_search_results(
+            self, request: HttpRequest, queryset: QuerySet, search_term: str
+    ):
+        """
+        Поиск заказов по адресу через триграммный индекс.
+
+        Без PostgreSQL используется стандартный поиск по search_fields.
+        """
+        if not search_term or not full_text_search_available():
+            return super().get_search_results(request, queryset, search_term)
+        return search_orders(queryset, search_term), False
+
+    def save_related(
+            self, request: HttpRequest, form, formsets, change: bool
+    ) -> None:
+        """
+        Пересчитывает итоги заказа после сохранения ProductInline:
+        строки таблицы связи сохраняются без сигнала m2m_changed.
+        """
+        super().save_related(request, form, formsets, change)
+        refresh_order_totals(Order.objects.filter(pk=form.instance.pk))
+        bump_order_versions(form.instance.user_id)
+
+    def export_products(self, pks: list) -> dict:
+        """
+        id товаров заказов пачки одним запросом.
+        """
+        return group_related_ids(
+            Order.products.through.objects, "order_id", "product_id", pks
+        )
 
     def user_verbose(self, obj: Order) -> str:
         """
@@ -236,13 +377,14 @@ class OrderAdmin(admin.ModelAdmin):
                 context=context,
                 status=400
             )
-        save_csv_orders(
+        job = enqueue_import(
+            ImportJob.Kind.ORDERS,
             file=form.cleaned_data["csv_file"],
             encoding=request.encoding,
             user=request.user,
         )
-        self.message_user(request, "Data from CSV was imported.")
-        return redirect("..")
+        self.message_user(request, "CSV import was queued.")
+        return redirect("admin:shop_importjob_change", job.pk)
 
     def get_urls(self):
         urls = super().get_urls()
@@ -254,3 +396,106 @@ class OrderAdmin(admin.ModelAdmin):
             )
         ]
         return new_urls + urls
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """
+    Админ-класс для фоновых задач импорта CSV.
+
+    Задачи создаются только через формы импорта и доступны
+    лишь для просмотра. Страница задачи обновляется сама,
+    пока импорт не завершён.
+    """
+    change_form_template = "shop/importjob_change_form.html"
+    list_display = ("pk",
+                    "kind",
+                    "status",
+                    "rows_processed",
+                    "created_count",
+                    "updated_count",
+                    "errors_count",
+                    "created_by",
+                    "created_at",
+                    "finished_at")
+    list_filter = ("kind", "status")
+    list_select_related = ("created_by",)
+    readonly_fields = ("kind",
+                       "status",
+                       "file",
+                       "encoding",
+                       "options",
+                       "created_by",
+                       "created_at",
+                       "started_at",
+                       "finished_at",
+                       "heartbeat_at",
+                       "attempts",
+                       "rows_processed",
+                       "created_count",
+                       "updated_count",
+                       "errors_count",
+                       "throughput_verbose",
+                       "errors_verbose",
+                       "failure")
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(
+            self, request: HttpRequest, obj: ImportJob = None
+    ) -> bool:
+        return False
+
+    @admin.display(description="Throughput")
+    def throughput_verbose(self, obj: ImportJob) -> str:
+        """
+        Скорость импорта в строках в секунду.
+        """
+        if obj.throughput is None:
+            return "-"
+        return f"{obj.throughput:.0f} rows/s"
+
+    @admin.display(description="Errors")
+    def errors_verbose(self, obj: ImportJob) -> str:
+        """
+        Ошибки импорта по строкам файла.
+        """
+        if not obj.errors:
+            return "-"
+        return format_html_join(
+            mark_safe("<br>"),
+            "Row {}: {}",
+            ((error["row"], error["error"]) for error in obj.errors),
+        )
+
+    def status_json(self, request: HttpRequest, pk: int) -> JsonResponse:
+        """
+        Текущее состояние задачи для опроса со страницы импорта.
+        """
+        if not self.has_view_permission(request):
+            return JsonResponse({"detail": "Forbidden"}, status=403)
+        job = get_object_or_404(ImportJob, pk=pk)
+        return JsonResponse({
+            "id": job.pk,
+            "kind": job.kind,
+            "status": job.status,
+            "rows_processed": job.rows_processed,
+            "created": job.created_count,
+            "updated": job.updated_count,
+            "errors_count": job.errors_count,
+            "throughput": job.throughput,
+            "failure": job.failure,
+            "url": reverse("admin:shop_importjob_change", args=[job.pk]),
+        })
+
+    def get_urls(self):
+        urls = super().get_urls()
+        new_urls = [
+            path(
+                "<int:pk>/status/",
+                self.admin_site.admin_view(self.status_json),
+                name="shop_importjob_status",
+            )
+        ]
+        return new_urls + urls
@@ -1,23 +1,293 @@
-import csv
+import json
+from csv import writer
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from urllib.parse import urlsplit
 
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Page, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
 from django.db.models import QuerySet
-from django.db.models.options import Options
-from django.http import HttpRequest, HttpResponse
+from django.forms.models import BaseInlineFormSet
+from django.http import (HttpRequest, HttpResponse, HttpResponseRedirect,
+                         QueryDict, StreamingHttpResponse)
+from django.utils.functional import cached_property
 
+from .common import CSV_EXPORT_CHUNK_SIZE, Echo, iter_chunks
 
-class ExportAsCSVMixin:
-    def export_as_csv(self, request: HttpRequest, queryset: QuerySet):
-        meta: Options = self.model._meta
-        field_names = [field.name for field in meta.fields]
 
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = f"attachment; filename={meta}-export.csv"
-        writer = csv.writer(response)
+class StreamingExportMixin:
+    """
+    Потоковая выгрузка выбранных объектов админки в CSV и NDJSON.
 
-        writer.writerow(field_names)
-        for obj in queryset:
-            writer.writerow([getattr(obj, field) for field in field_names])
+    Строки читаются через values_list() и iterator(chunk_size), поэтому
+    память не зависит от размера выборки. Колонки задаются в
+    export_columns (заголовок -> путь поля, связи по внешнему ключу
+    через join). Колонки из export_related заполняются методом
+    export_<имя>(pks) одним запросом на пачку строк - так выгружаются
+    связи многие-ко-многим.
+    """
 
+    actions = ["export_csv", "export_ndjson"]
+    export_columns: Dict[str, str] = {}
+    export_related: Sequence[str] = ()
+    export_chunk_size = CSV_EXPORT_CHUNK_SIZE
+
+    def get_export_header(self) -> List[str]:
+        return [*self.export_columns, *self.export_related]
+
+    def iter_export_rows(self, queryset: QuerySet) -> Iterator[List[list]]:
+        """
+        Строки выгрузки пачками по export_chunk_size.
+
+        Yields:
+            Списки строк в порядке get_export_header().
+        """
+        rows = (
+            queryset
+            .prefetch_related(None)
+            .order_by("pk")
+            .values_list("pk", *self.export_columns.values())
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        for chunk in iter_chunks(rows, self.export_chunk_size):
+            pks = [row[0] for row in chunk]
+            related = [
+                getattr(self, f"export_{name}")(pks)
+                for name in self.export_related
+            ]
+            yield [
+                [*row[1:], *(values.get(row[0]) for values in related)]
+                for row in chunk
+            ]
+
+    def iter_csv(self, queryset: QuerySet) -> Iterator[str]:
+        csv_writer = writer(Echo())
+        yield csv_writer.writerow(self.get_export_header())
+        for rows in self.iter_export_rows(queryset):
+            yield "".join(csv_writer.writerow(row) for row in rows)
+
+    def iter_ndjson(self, queryset: QuerySet) -> Iterator[str]:
+        header = self.get_export_header()
+        for rows in self.iter_export_rows(queryset):
+            yield "".join(
+                json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder)
+                + "\n"
+                for row in rows
+            )
+
+    def export_response(
+            self, content: Iterator[str], content_type: str, extension: str
+    ) -> StreamingHttpResponse:
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"{self.model._meta.model_name}-export.{extension}"
+        response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
 
-    export_as_csv.short_description = "Export as CSV"
+    @admin.action(description="Export as CSV")
+    def export_csv(
+            self, request: HttpRequest, queryset: QuerySet
+    ) -> StreamingHttpResponse:
+        return self.export_response(self.iter_csv(queryset), "text/csv", "csv")
+
+    @admin.action(description="Export as NDJSON")
+    def export_ndjson(
+            self, request: HttpRequest, queryset: QuerySet
+    ) -> StreamingHttpResponse:
+        return self.export_response(
+            self.iter_ndjson(queryset), "application/x-ndjson", "ndjson"
+        )
+
+
+def group_related_ids(
+        queryset: QuerySet, key: str, value: str, pks: List[Any]
+) -> Dict[Any, List[Any]]:
+    """
+    Связанные id для пачки объектов одним запросом к таблице связи.
+
+    Args:
+        queryset: Таблица связи, например Order.products.through.objects.
+        key: Поле с id выгружаемого объекта.
+        value: Поле с id связанного объекта.
+        pks: id выгружаемых объектов.
+    """
+    grouped = {pk: [] for pk in pks}
+    rows = (
+        queryset
+        .filter(**{f"{key}__in": pks})
+        .order_by(key, value)
+        .values_list(key, value)
+    )
+    for pk, related_pk in rows:
+        grouped[pk].append(related_pk)
+    return grouped
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Оценка количества строк по статистике PostgreSQL.
+
+    Без фильтров берётся pg_class.reltuples таблицы, с фильтрами -
+    оценка планировщика из EXPLAIN. Запрос при этом не выполняется.
+
+    Returns:
+        Оценка или None, если СУБД не PostgreSQL или статистики нет.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    if not queryset.query.where and not queryset.query.distinct:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class"
+                " WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+    else:
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        estimate = plan[0]["Plan"]["Plan Rows"]
+    # reltuples = -1: таблица ещё не анализировалась.
+    return int(estimate) if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator, который для больших выборок не выполняет COUNT(*).
+
+    Если оценка количества строк больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD, количество берётся из оценки,
+    иначе считается точно.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimate_count(self.object_list)
+        if (
+                estimate is not None
+                and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        ):
+            return estimate
+        return super().count
+
+
+class LeanChangeList(ChangeList):
+    def get_queryset(
+            self, request: HttpRequest, exclude_parameters=None
+    ) -> QuerySet:
+        queryset = super().get_queryset(request, exclude_parameters)
+        return self.model_admin.get_changelist_queryset(queryset)
+
+
+class LargeTableAdminMixin:
+    """
+    Список объектов админки для больших таблиц.
+
+    Количество строк оценивается (EstimatedCountPaginator), общее
+    количество без фильтров не запрашивается. В списке сбрасываются
+    prefetch_related() из get_queryset() (нужные списку задаются
+    в list_prefetch_related) и откладываются поля list_defer.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_prefetch_related: Sequence[str] = ()
+    list_defer: Sequence[str] = ()
+
+    def get_changelist(self, request: HttpRequest, **kwargs):
+        return LeanChangeList
+
+    def get_changelist_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = queryset.prefetch_related(None)
+        if self.list_prefetch_related:
+            queryset = queryset.prefetch_related(*self.list_prefetch_related)
+        if self.list_defer:
+            queryset = queryset.defer(*self.list_defer)
+        return queryset
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Formset инлайна, который показывает одну страницу связанных строк.
+
+    Номер страницы берётся из параметра <prefix>-page адреса страницы
+    изменения; форма отправляется на тот же адрес, поэтому при
+    сохранении обрабатывается та же страница. Размер страницы
+    и параметры адреса задаёт PaginatedInlineMixin.get_formset().
+    """
+
+    per_page: int
+    query_params: QueryDict
+    page_number = 1
+    page: Page
+
+    def get_queryset(self) -> QuerySet:
+        if not hasattr(self, "_queryset"):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_query(self, number: int) -> str:
+        """
+        Строка запроса страницы number с остальными параметрами
+        адреса (страницы других инлайнов, _changelist_filters).
+        """
+        params = self.query_params.copy()
+        params[f"{self.prefix}-page"] = number
+        return params.urlencode()
+
+    @property
+    def previous_page_query(self) -> str:
+        return self.page_query(self.page.previous_page_number())
+
+    @property
+    def next_page_query(self) -> str:
+        return self.page_query(self.page.next_page_number())
+
+
+class PaginatedInlineMixin:
+    """
+    Инлайн с постраничным выводом связанных строк.
+
+    Связанный объект каждой строки стоит выбирать через
+    autocomplete_fields или raw_id_fields, а не через <select>
+    со всеми объектами таблицы.
+    """
+
+    formset = PaginatedInlineFormSet
+    template = "admin/shop/edit_inline/paginated_tabular.html"
+    per_page = 20
+
+    def get_formset(self, request: HttpRequest, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        page_param = f"{formset.get_default_prefix()}-page"
+        return type(formset.__name__, (formset,), {
+            "per_page": self.per_page,
+            "query_params": request.GET,
+            "page_number": request.GET.get(page_param, 1),
+        })
+
+
+class PaginatedInlinesAdminMixin:
+    """
+    ModelAdmin с инлайнами PaginatedInlineMixin: после "Сохранить
+    и продолжить" открываются те же страницы инлайнов.
+    """
+
+    def response_change(self, request: HttpRequest, obj) -> HttpResponse:
+        response = super().response_change(request, obj)
+        if "_continue" not in request.POST or not isinstance(
+                response, HttpResponseRedirect
+        ):
+            return response
+        url = urlsplit(response.url)
+        query = QueryDict(url.query, mutable=True)
+        for name, values in request.GET.lists():
+            if name.endswith("-page"):
+                query.setlist(name, values)
+        response["Location"] = url._replace(query=query.urlencode()).geturl()
+        return response
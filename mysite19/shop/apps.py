@@ -19,3 +19,9 @@ class ShopConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "shop"
+
+    def ready(self) -> None:
+        """
+        Подключение обработчиков сигналов приложения.
+        """
+        from . import signals  # noqa: F401
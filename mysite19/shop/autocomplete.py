@@ -0,0 +1,92 @@
+"""
+Поиск по началу строки для виджетов выбора формы заказа.
+
+Товары ищутся по началу названия без учёта регистра. На PostgreSQL
+условие name__istartswith (UPPER(name::text) LIKE 'AB%') выполняется
+по индексу shop_product_name_prefix с классом операторов
+text_pattern_ops. Пользователи ищутся по началу username с учётом
+регистра: для уникального поля Django сам создаёт на PostgreSQL
+индекс varchar_pattern_ops.
+
+Первые AUTOCOMPLETE_LIMIT результатов каждого префикса хранятся
+в кэше SHOP_AUTOCOMPLETE_CACHE_TIMEOUT секунд. Ключ товаров содержит
+версию каталога ("products", см. mysite19.cache_versions), поэтому
+изменённые товары видны сразу; список пользователей может отставать
+не дольше таймаута.
+"""
+
+from hashlib import sha1
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from mysite19.cache_versions import get_version
+
+from .models import Product
+
+AUTOCOMPLETE_CACHE_PREFIX = "autocomplete"
+AUTOCOMPLETE_LIMIT = 20
+
+
+def autocomplete_cache_key(kind: str, term: str, version: int = 0) -> str:
+    # Префикс может содержать пробелы и символы, недопустимые в memcached.
+    digest = sha1(term.encode()).hexdigest()
+    return f"{AUTOCOMPLETE_CACHE_PREFIX}:{kind}:{version}:{digest}"
+
+
+def cached_results(
+        key: str, search: Callable[[], List[Dict]]
+) -> List[Dict]:
+    results = cache.get(key)
+    if results is None:
+        results = search()
+        cache.set(key, results, settings.SHOP_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results
+
+
+def search_products(term: str) -> List[Dict]:
+    """
+    Товары, название которых начинается с term.
+
+    Returns:
+        Результаты в формате select2: [{"id": ..., "text": ...}].
+    """
+    term = term.strip()
+    if len(term) < settings.SHOP_AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    key = autocomplete_cache_key(
+        "products", term.upper(), get_version("products")
+    )
+    return cached_results(key, lambda: [
+        {"id": pk, "text": name}
+        for pk, name in (
+            Product.objects
+            .filter(archived=False, name__istartswith=term)
+            .order_by("name", "pk")
+            .values_list("pk", "name")[:AUTOCOMPLETE_LIMIT]
+        )
+    ])
+
+
+def search_users(term: str) -> List[Dict]:
+    """
+    Пользователи, username которых начинается с term.
+
+    Returns:
+        Результаты в формате select2: [{"id": ..., "text": ...}].
+    """
+    term = term.strip()
+    if len(term) < settings.SHOP_AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    key = autocomplete_cache_key("users", term)
+    return cached_results(key, lambda: [
+        {"id": pk, "text": username}
+        for pk, username in (
+            User.objects
+            .filter(username__startswith=term)
+            .order_by("username")
+            .values_list("pk", "username")[:AUTOCOMPLETE_LIMIT]
+        )
+    ])
@@ -1,47 +1,397 @@
 from ast import literal_eval
-from csv import DictReader
+from csv import DictReader, writer
 from io import TextIOWrapper
+from itertools import islice
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple)
 
-from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import QuerySet
 
+from mysite19.cache_versions import bump_version
 from shop.models import Order, Product
+from shop.product_cache import evict_products
+from shop.search import refresh_search_vector
+from shop.signals import bump_order_versions
+from shop.totals import orders_with_products, refresh_order_totals
 
+CSV_EXPORT_CHUNK_SIZE = 2000
+CSV_IMPORT_CHUNK_SIZE = 1000
+CSV_IMPORT_BATCH_SIZE = 500
+# Сколько ошибок по строкам импорт хранит в итогах, остальные
+# только подсчитываются.
+CSV_IMPORT_ERRORS_LIMIT = 1000
+PRODUCT_CSV_FIELDS = ("sku", "name", "description", "price", "discount")
+PRODUCT_UPSERT_FIELDS = [
+    "name", "description", "price", "discount", "updated_at"
+]
 
-def save_csv_products(file, encoding, user):
-    csv_file = TextIOWrapper(
-        file,
-        encoding=encoding,
+
+class Echo:
+    """
+    Псевдо-буфер для csv.writer.
+
+    Не накапливает данные, а сразу возвращает записанную строку.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv_rows(
+        queryset: QuerySet,
+        columns: Dict[str, str],
+        chunk_size: int = CSV_EXPORT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Построчная выгрузка queryset в CSV для StreamingHttpResponse.
+
+    Строки читаются через values_list() и iterator(chunk_size),
+    поэтому на PostgreSQL используется серверный курсор и в памяти
+    одновременно находится не больше одной пачки строк.
+
+    Args:
+        queryset: Выгружаемый queryset.
+        columns: Заголовок колонки -> путь поля для values_list().
+        chunk_size: Размер пачки строк.
+
+    Yields:
+        Фрагменты CSV, по одному на пачку строк.
+    """
+    csv_writer = writer(Echo())
+    yield csv_writer.writerow(columns.keys())
+    rows = (
+        queryset
+        .values_list(*columns.values())
+        .iterator(chunk_size=chunk_size)
     )
-    reader = DictReader(csv_file)
+    buffer = []
+    for row in rows:
+        buffer.append(csv_writer.writerow(row))
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Разбивает итерируемый объект на списки длиной не больше size.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
-    products = [
-        Product(**row, created_by=user)
-        for row in reader
-    ]
-    Product.objects.bulk_create(products)
-    return products
+def add_errors(summary: dict, errors: List[dict], limit: int) -> None:
+    """
+    Учитывает ошибки пачки в итогах импорта: считает все,
+    а хранит только первые limit.
+    """
+    summary["errors_count"] += len(errors)
+    summary["errors"].extend(errors[:max(limit - len(summary["errors"]), 0)])
+
+
+def parse_product_row(row: Dict[str, str], user) -> Product:
+    """
+    Проверяет строку CSV с товаром и преобразует её в Product.
+
+    Лишние колонки (например, created_by из выгрузки) игнорируются,
+    значения проверяются валидаторами полей модели.
+
+    Raises:
+        ValidationError: Если строка некорректна.
+    """
+    data = {
+        field: row[field].strip()
+        for field in PRODUCT_CSV_FIELDS
+        if row.get(field) not in (None, "")
+    }
+    product = Product(**data, created_by=user)
+    product.full_clean(
+        exclude=["preview", "search_vector"],
+        validate_unique=False,
+        validate_constraints=False,
+    )
+    return product
+
+
+def save_products_chunk(
+        rows: List[Tuple[int, Dict[str, str]]],
+        user,
+        upsert: bool,
+        batch_size: int,
+) -> Tuple[int, int, List[dict]]:
+    """
+    Сохраняет пачку строк CSV с товарами.
+
+    Существующие артикулы (sku) пачки проверяются одним запросом.
+    В режиме upsert товары с известным sku обновляются
+    (INSERT ... ON CONFLICT (sku) DO UPDATE), иначе такие строки
+    считаются ошибочными.
+
+    Returns:
+        Количество созданных и обновлённых товаров, ошибки по строкам.
+    """
+    errors = []
+    products = {}
+    for line, row in rows:
+        try:
+            product = parse_product_row(row, user)
+        except ValidationError as exc:
+            errors.append({
+                "row": line,
+                "error": "; ".join(
+                    f"{field}: {' '.join(messages)}"
+                    for field, messages in exc.message_dict.items()
+                ),
+            })
+            continue
+        key = product.sku or f"row-{line}"
+        if key in products:
+            errors.append({
+                "row": products[key][0],
+                "error": f"duplicate sku {product.sku!r}, replaced by row {line}",
+            })
+        products[key] = (line, product)
+
+    skus = [product.sku for _, product in products.values() if product.sku]
+    existing_skus = set(
+        Product.objects.filter(sku__in=skus).values_list("sku", flat=True)
+    )
+    if not upsert:
+        for key, (line, product) in list(products.items()):
+            if product.sku in existing_skus:
+                errors.append({
+                    "row": line,
+                    "error": f"sku {product.sku!r} already exists",
+                })
+                del products[key]
+
+    objs = [product for _, product in products.values()]
+    options = {}
+    if upsert:
+        options = {
+            "update_conflicts": True,
+            "unique_fields": ["sku"],
+            "update_fields": PRODUCT_UPSERT_FIELDS,
+        }
+    with transaction.atomic():
+        Product.objects.bulk_create(objs, batch_size=batch_size, **options)
+        refresh_search_vector(
+            Product.objects.filter(pk__in=[obj.pk for obj in objs])
+        )
+        if upsert and existing_skus:
+            updated_ids = [obj.pk for obj in objs if obj.sku in existing_skus]
+            # Цены обновлённых товаров могли измениться.
+            refresh_order_totals(orders_with_products(updated_ids))
+            evict_products(updated_ids)
+    updated = len(existing_skus) if upsert else 0
+    errors.sort(key=lambda error: error["row"])
+    return len(objs) - updated, updated, errors
 
-def save_csv_orders(file, encoding, user):
+
+def save_csv_products(
+        file,
+        encoding,
+        user,
+        upsert: bool = False,
+        chunk_size: int = CSV_IMPORT_CHUNK_SIZE,
+        batch_size: int = CSV_IMPORT_BATCH_SIZE,
+        errors_limit: int = CSV_IMPORT_ERRORS_LIMIT,
+        skip_rows: int = 0,
+        progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Потоковый импорт товаров из CSV.
+
+    Файл читается построчно, в памяти находится не больше одной
+    пачки строк. Каждая пачка сохраняется в своей транзакции.
+
+    Args:
+        file: Бинарный файл CSV с колонками sku, name, description,
+            price, discount.
+        encoding: Кодировка файла.
+        user: Автор создаваемых товаров.
+        upsert: Обновлять товары с уже существующим sku.
+        chunk_size: Количество строк в пачке.
+        batch_size: Размер одного INSERT внутри пачки.
+        errors_limit: Сколько ошибок хранить в итогах.
+        skip_rows: Сколько первых строк пропустить (продолжение
+            прерванного импорта), в итогах они не учитываются.
+        progress: Вызывается с промежуточными итогами после каждой пачки.
+
+    Returns:
+        Итоги импорта: rows, created, updated, errors_count и errors
+        (номер строки и причина, не больше errors_limit).
+    """
     csv_file = TextIOWrapper(file, encoding=encoding)
     reader = DictReader(csv_file)
+    summary = {
+        "rows": 0, "created": 0, "updated": 0, "errors_count": 0, "errors": []
+    }
+    # Первая строка файла - заголовок.
+    rows = islice(enumerate(reader, start=2), skip_rows, None)
+    for chunk in iter_chunks(rows, chunk_size):
+        summary["rows"] += len(chunk)
+        try:
+            created, updated, errors = save_products_chunk(
+                chunk, user, upsert, batch_size
+            )
+        except DatabaseError as exc:
+            created = updated = 0
+            errors = [{"row": line, "error": str(exc)} for line, _ in chunk]
+        summary["created"] += created
+        summary["updated"] += updated
+        add_errors(summary, errors, errors_limit)
+        if created or updated:
+            bump_version("products")
+        if progress is not None:
+            progress(summary)
+    return summary
+
+
+def parse_order_row(row: Dict[str, str]) -> Tuple[dict, List[int]]:
+    """
+    Проверяет строку CSV с заказом.
+
+    Returns:
+        Поля заказа и список id товаров.
+
+    Raises:
+        ValueError: Если строка некорректна.
+    """
+    delivery_address = (row.get("delivery_address") or "").strip()
+    if not delivery_address:
+        raise ValueError("delivery_address is required")
+    promo_code = (row.get("promo_code") or "").strip()
+    promo_code_length = Order._meta.get_field("promo_code").max_length
+    if len(promo_code) > promo_code_length:
+        raise ValueError(
+            f"promo_code is longer than {promo_code_length} characters"
+        )
+    try:
+        products_ids = literal_eval(row.get("products") or "[]")
+    except (SyntaxError, ValueError):
+        raise ValueError("products must be a list of ids, e.g. [1, 2]")
+    if not isinstance(products_ids, (list, tuple)) or not all(
+            isinstance(pk, int) for pk in products_ids
+    ):
+        raise ValueError("products must be a list of ids, e.g. [1, 2]")
+    order_data = {
+        "delivery_address": delivery_address,
+        "promo_code": promo_code,
+    }
+    return order_data, list(dict.fromkeys(products_ids))
+
+
+def save_orders_chunk(
+        rows: List[Tuple[int, Dict[str, str]]], user
+) -> Tuple[int, List[dict]]:
+    """
+    Сохраняет пачку строк CSV с заказами.
+
+    Все товары пачки проверяются одним запросом, заказы и связи
+    с товарами создаются через bulk_create.
+
+    Args:
+        rows: Пары (номер строки в файле, строка CSV).
+        user: Владелец создаваемых заказов.
+
+    Returns:
+        Количество созданных заказов и ошибки по строкам.
+    """
+    errors = []
+    parsed = []
+    for line, row in rows:
+        try:
+            parsed.append((line, *parse_order_row(row)))
+        except ValueError as exc:
+            errors.append({"row": line, "error": str(exc)})
+
+    requested_ids = {pk for _, _, products_ids in parsed for pk in products_ids}
+    prices = dict(
+        Product.objects
+        .filter(pk__in=requested_ids)
+        .values_list("pk", "price")
+    )
+    orders = []
+    orders_products = []
+    for line, order_data, products_ids in parsed:
+        missing_ids = [pk for pk in products_ids if pk not in prices]
+        if missing_ids:
+            errors.append({
+                "row": line,
+                "error": f"unknown products: {missing_ids}",
+            })
+            continue
+        orders.append(Order(
+            **order_data,
+            user=user,
+            total_price=sum(prices[pk] for pk in products_ids),
+            products_count=len(products_ids),
+        ))
+        orders_products.append(products_ids)
+
     with transaction.atomic():
-        for row in reader:
-            order_data = {
-                "delivery_address": row.get("delivery_address", ""),
-                "promo_code": row.get("promo_code", ""),
-                "user": user,
-            }
-
-            try:
-                products_str = row.get("products", "[]")
-                products_ids = literal_eval(products_str)
-                if not isinstance(products_ids, list):
-                    products_ids = []
-            except (SyntaxError, ValueError):
-                products_ids = []
-
-            order = Order.objects.create(**order_data)
-
-            if products_ids:
-                products = Product.objects.filter(pk__in=products_ids)
-                order.products.set(products)
+        Order.objects.bulk_create(orders)
+        Order.products.through.objects.bulk_create([
+            Order.products.through(order_id=order.pk, product_id=product_id)
+            for order, products_ids in zip(orders, orders_products)
+            for product_id in products_ids
+        ])
+    errors.sort(key=lambda error: error["row"])
+    return len(orders), errors
+
+
+def save_csv_orders(
+        file,
+        encoding,
+        user,
+        chunk_size: int = CSV_IMPORT_CHUNK_SIZE,
+        errors_limit: int = CSV_IMPORT_ERRORS_LIMIT,
+        skip_rows: int = 0,
+        progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Импорт заказов из CSV пачками.
+
+    Каждая пачка сохраняется в своей транзакции, поэтому блокировки
+    короткие, а ошибка в одной строке или пачке не отменяет весь файл.
+
+    Args:
+        file: Бинарный файл CSV с колонками delivery_address,
+            promo_code, products ("[1, 2]").
+        encoding: Кодировка файла.
+        user: Владелец создаваемых заказов.
+        chunk_size: Количество строк в пачке.
+        errors_limit: Сколько ошибок хранить в итогах.
+        skip_rows: Сколько первых строк пропустить (продолжение
+            прерванного импорта), в итогах они не учитываются.
+        progress: Вызывается с промежуточными итогами после каждой пачки.
+
+    Returns:
+        Итоги импорта: rows, created, errors_count и errors
+        (номер строки и причина, не больше errors_limit).
+    """
+    csv_file = TextIOWrapper(file, encoding=encoding)
+    reader = DictReader(csv_file)
+    summary = {"rows": 0, "created": 0, "errors_count": 0, "errors": []}
+    # Первая строка файла - заголовок.
+    rows = islice(enumerate(reader, start=2), skip_rows, None)
+    for chunk in iter_chunks(rows, chunk_size):
+        summary["rows"] += len(chunk)
+        try:
+            created, errors = save_orders_chunk(chunk, user)
+        except DatabaseError as exc:
+            created = 0
+            errors = [{"row": line, "error": str(exc)} for line, _ in chunk]
+        summary["created"] += created
+        add_errors(summary, errors, errors_limit)
+        if created:
+            bump_order_versions(user.pk)
+        if progress is not None:
+            progress(summary)
+    return summary
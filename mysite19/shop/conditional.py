@@ -0,0 +1,80 @@
+"""
+Условные GET-запросы (ETag / Last-Modified).
+
+Валидаторы одного объекта считаются по его updated_at, ETag
+коллекции - по версиям кэша (mysite19.cache_versions) без запроса
+к базе.
+Если клиент прислал совпадающие If-None-Match / If-Modified-Since,
+возвращается 304 без тела и без выборки самих данных.
+"""
+
+from datetime import datetime
+from hashlib import md5
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+Validators = Tuple[str, Optional[datetime]]
+
+
+def make_etag(*parts: Hashable) -> str:
+    """
+    ETag из частей состояния ресурса.
+    """
+    raw = ":".join(str(part) for part in parts)
+    return quote_etag(md5(raw.encode()).hexdigest())
+
+
+def object_validators(updated_at: datetime, *parts: Hashable) -> Validators:
+    """
+    Валидаторы одного объекта по его updated_at.
+    """
+    return make_etag(updated_at.isoformat(), *parts), updated_at
+
+
+def not_modified(
+        request: HttpRequest, validators: Validators
+) -> Optional[HttpResponse]:
+    """
+    Ответ 304 (или 412 для небезопасных методов), если ресурс
+    не изменился с версии клиента, иначе None.
+    """
+    etag, last_modified = validators
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(response: Any, validators: Validators) -> Any:
+    """
+    Добавляет ETag и Last-Modified к успешному ответу.
+    """
+    etag, last_modified = validators
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(
+                last_modified.timestamp()
+            )
+    return response
+
+
+def conditional(
+        request: HttpRequest, validators: Validators, render: Callable[[], Any]
+) -> Any:
+    """
+    304 для неизменённого ресурса, иначе render() с валидаторами.
+
+    Args:
+        request: HTTP-запрос.
+        validators: ETag и Last-Modified ресурса.
+        render: Строит полный ответ, вызывается только при изменениях.
+    """
+    response = not_modified(request, validators)
+    if response is None:
+        response = render()
+    return set_validators(response, validators)
@@ -2,10 +2,12 @@
 
 from typing import Any, List, Optional, Union
 
+from django.conf import settings
 from django.contrib.auth.models import Group
-from django.forms import (CheckboxSelectMultiple, ClearableFileInput,
-                          FileField, Form, ImageField, ModelForm,
-                          ModelMultipleChoiceField)
+from django.forms import (BooleanField, ClearableFileInput, FileField, Form,
+                          ImageField, ModelForm, ModelMultipleChoiceField)
+from django_select2.forms import (ModelSelect2MultipleWidget,
+                                  ModelSelect2Widget)
 
 from .models import Order, Product
 
@@ -13,6 +15,19 @@ from .models import Order, Product
 class CSVImportForm(Form):
     csv_file = FileField()
 
+
+class ProductCSVImportForm(CSVImportForm):
+    """
+    Форма импорта товаров с режимом обновления по артикулу (sku).
+    """
+
+    upsert = BooleanField(
+        required=False,
+        help_text="Update products with an existing sku instead of "
+                  "reporting them as errors.",
+    )
+
+
 class MultipleFileInput(ClearableFileInput):
     """
     Виджет для загрузки нескольких файлов.
@@ -56,7 +71,9 @@ class ProductForm(ModelForm):
 
     class Meta:
         model = Product
-        fields = ("name", "description", "price", "discount", "preview")
+        fields = (
+            "name", "sku", "description", "price", "discount", "preview"
+        )
 
     images = MultipleImageField(
         widget=MultipleFileInput(attrs={"multiple": True}),
@@ -64,10 +81,51 @@ class ProductForm(ModelForm):
     )
 
 
+class PrefixSearchWidgetMixin:
+    """
+    Виджет django_select2, который ищет через собственный адрес
+    (см. shop.autocomplete).
+
+    В разметку попадают только выбранные объекты, остальные
+    подгружаются по мере ввода. Виджет не регистрируется в кэше
+    django_select2: его адрес поиска не читает настройки виджета.
+    """
+
+    label_field = "pk"
+
+    def __init__(self, *args, **kwargs) -> None:
+        # ModelSelect2Mixin по умолчанию подставляет адрес django_select2.
+        kwargs.setdefault("data_view", self.data_view)
+        super().__init__(*args, **kwargs)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        min_length = settings.SHOP_AUTOCOMPLETE_MIN_LENGTH
+        base_attrs = {"data-minimum-input-length": min_length, **base_attrs}
+        return super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+
+    def set_to_cache(self) -> None:
+        pass
+
+    def label_from_instance(self, obj) -> str:
+        return str(getattr(obj, self.label_field))
+
+
+class ProductSelect2Widget(
+        PrefixSearchWidgetMixin, ModelSelect2MultipleWidget
+):
+    data_view = "shop:product_autocomplete"
+    label_field = "name"
+
+
+class UserSelect2Widget(PrefixSearchWidgetMixin, ModelSelect2Widget):
+    data_view = "shop:user_autocomplete"
+    label_field = "username"
+
+
 class OrderForm(ModelForm):
     """
     Форма для создания и редактирования заказа.
-    Позволяет выбрать несколько продуктов через чекбоксы.
+    Пользователь и продукты выбираются поиском по началу строки.
     """
 
     class Meta:
@@ -77,10 +135,11 @@ class OrderForm(ModelForm):
             "delivery_address",
             "promo_code",
         )
+        widgets = {"user": UserSelect2Widget}
 
     products = ModelMultipleChoiceField(
         queryset=Product.objects.filter(archived=False),
-        widget=CheckboxSelectMultiple
+        widget=ProductSelect2Widget,
     )
 
 
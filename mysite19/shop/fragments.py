@@ -0,0 +1,58 @@
+"""
+Кэш HTML-фрагментов списков.
+
+Каждый элемент страницы (карточка товара, блок заказа) рендерится
+отдельным шаблоном и кэшируется по ключу, в который входит его
+версия. Фрагменты страницы читаются одним get_many, отрендерить
+приходится только отсутствующие, поэтому время рендера страницы
+зависит от её размера, а не от размера каталога.
+"""
+
+from typing import Any, Callable, Hashable, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.translation import get_language
+
+FRAGMENT_CACHE_PREFIX = "fragment"
+
+
+def fragment_key(template_name: str, *parts: Hashable) -> str:
+    """
+    Ключ фрагмента: шаблон, язык и части версии объекта.
+    """
+    return ":".join(
+        str(part)
+        for part in (FRAGMENT_CACHE_PREFIX, template_name, get_language(), *parts)
+    )
+
+
+def render_fragments(
+        template_name: str,
+        objects: Iterable[Any],
+        key_parts: Callable[[Any], tuple],
+        context_name: str = "object",
+) -> List[SafeString]:
+    """
+    HTML-фрагменты объектов в исходном порядке.
+
+    Args:
+        template_name: Шаблон одного фрагмента.
+        objects: Объекты страницы.
+        key_parts: Части ключа объекта, меняющиеся вместе с его
+            отображением (pk, updated_at, ...).
+        context_name: Имя объекта в контексте шаблона.
+    """
+    objects = list(objects)
+    keys = [fragment_key(template_name, *key_parts(obj)) for obj in objects]
+    found = cache.get_many(keys)
+    missing = {}
+    for key, obj in zip(keys, objects):
+        if key not in found:
+            missing[key] = render_to_string(template_name, {context_name: obj})
+    if missing:
+        cache.set_many(missing, timeout=settings.SHOP_FRAGMENT_CACHE_TIMEOUT)
+        found.update(missing)
+    return [mark_safe(found[key]) for key in keys]
@@ -0,0 +1,96 @@
+"""
+Уменьшенные копии изображений: построение Pillow и имена файлов.
+
+Модуль не зависит от Django: render_variants() выполняется
+в процессах пула (см. shop.thumbnails), получает и возвращает байты.
+"""
+
+import os
+from io import BytesIO
+from typing import Any, Iterable, List, NamedTuple, Tuple
+
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Ширина, копия в формате оригинала, копия WebP.
+RenderedVariant = Tuple[int, bytes, bytes]
+
+
+class ImageVariant(NamedTuple):
+    width: int
+    url: str
+    webp_url: str
+
+
+def variant_name(name: str, width: int, webp: bool = False) -> str:
+    """
+    Имя копии рядом с оригиналом.
+    """
+    root, ext = os.path.splitext(name)
+    return f"{root}_{width}w{'.webp' if webp else ext}"
+
+
+def image_variants(file: Any, variants: dict) -> List[ImageVariant]:
+    """
+    Готовые копии изображения по возрастанию ширины.
+
+    Args:
+        file: Файл изображения (product.preview, image.image).
+        variants: Значение поля копий этого изображения.
+    """
+    if not file or not variants or variants.get("name") != file.name:
+        return []
+    storage = file.storage
+    return [
+        ImageVariant(
+            width,
+            storage.url(variant_name(file.name, width)),
+            storage.url(variant_name(file.name, width, webp=True)),
+        )
+        for width in variants["widths"]
+    ]
+
+
+def render_variants(
+        data: bytes, widths: Iterable[int]
+) -> List[RenderedVariant]:
+    """
+    Копии изображения заданных ширин с сохранением пропорций.
+
+    Ширины не меньше ширины оригинала пропускаются: увеличенная
+    копия только тяжелее оригинала.
+
+    Args:
+        data: Содержимое исходного файла.
+        widths: Ширины копий в пикселях.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image_format = source.format or "PNG"
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    variants = []
+    for width in sorted(set(widths)):
+        if width >= image.width:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        variants.append(
+            (width, encode(resized, image_format), encode(resized, "WEBP"))
+        )
+    return variants
+
+
+def encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = BytesIO()
+    if image_format == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    elif image_format == "WEBP":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, image_format)
+    return buffer.getvalue()
@@ -0,0 +1,178 @@
+"""
+Фоновые задачи импорта CSV.
+
+Очередь хранится в таблице ImportJob. Админка ставит задачу
+в очередь и сразу возвращает ответ, а воркер (команда
+run_import_jobs) забирает задачи через SELECT ... FOR UPDATE
+SKIP LOCKED, поэтому несколько воркеров не возьмут одну задачу.
+
+После каждой пачки воркер сохраняет прогресс и отметку heartbeat_at.
+Задача, отметка которой старше SHOP_IMPORT_JOB_LEASE (воркер упал
+или был убит), снова забирается из очереди и продолжается со строки
+после последней сохранённой пачки. После SHOP_IMPORT_JOB_MAX_ATTEMPTS
+попыток задача считается неудачной.
+"""
+
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from loguru import logger
+
+from .common import save_csv_orders, save_csv_products
+from .models import ImportJob
+
+# Сколько ошибок по строкам хранится в задаче.
+JOB_ERRORS_LIMIT = 1000
+
+IMPORTERS = {
+    ImportJob.Kind.PRODUCTS: save_csv_products,
+    ImportJob.Kind.ORDERS: save_csv_orders,
+}
+
+
+def enqueue_import(
+        kind: str, file: File, encoding: Optional[str], user, **options
+) -> ImportJob:
+    """
+    Сохраняет загруженный файл и ставит импорт в очередь.
+
+    Args:
+        kind: Вид импорта, ImportJob.Kind.
+        file: Загруженный файл CSV.
+        encoding: Кодировка файла.
+        user: Пользователь, запустивший импорт.
+        options: Дополнительные параметры импортёра (например, upsert).
+    """
+    job = ImportJob(
+        kind=kind,
+        encoding=encoding or "utf-8",
+        options=options,
+        created_by=user,
+    )
+    job.file.save(file.name, file, save=False)
+    job.save()
+    logger.info(f"Поставлен в очередь импорт {job}")
+    return job
+
+
+def claim_next_job() -> Optional[ImportJob]:
+    """
+    Забирает из очереди самую старую задачу, ожидающую запуска
+    или брошенную воркером, и помечает её запущенной.
+    """
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            stale = now - timedelta(seconds=settings.SHOP_IMPORT_JOB_LEASE)
+            job = (
+                ImportJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=ImportJob.Status.PENDING)
+                    | Q(
+                        status=ImportJob.Status.RUNNING,
+                        heartbeat_at__lt=stale,
+                    )
+                )
+                .order_by("pk")
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts >= settings.SHOP_IMPORT_JOB_MAX_ATTEMPTS:
+                job.status = ImportJob.Status.FAILED
+                job.failure = f"Worker lost {job.attempts} times"
+                job.finished_at = now
+                job.save(update_fields=["status", "failure", "finished_at"])
+                logger.error(f"Импорт {job}: {job.failure}")
+                continue
+            if job.status == ImportJob.Status.RUNNING:
+                logger.warning(
+                    f"Импорт {job} продолжается после строки"
+                    f" {job.rows_processed}: воркер не отвечает"
+                )
+            job.status = ImportJob.Status.RUNNING
+            job.started_at = job.started_at or now
+            job.heartbeat_at = now
+            job.attempts += 1
+            job.save(update_fields=[
+                "status", "started_at", "heartbeat_at", "attempts"
+            ])
+        return job
+
+
+def job_totals(job: ImportJob, summary: dict) -> dict:
+    """
+    Итоги задачи: сохранённые до запуска плюс итоги текущего запуска.
+    """
+    return {
+        "rows_processed": job.rows_processed + summary["rows"],
+        "created_count": job.created_count + summary["created"],
+        "updated_count": job.updated_count + summary.get("updated", 0),
+        "errors_count": job.errors_count + summary["errors_count"],
+        "errors": (job.errors + summary["errors"])[:JOB_ERRORS_LIMIT],
+    }
+
+
+def report_progress(job: ImportJob, summary: dict) -> None:
+    """
+    Сохраняет промежуточные итоги импорта и продлевает аренду
+    задачи одним UPDATE.
+    """
+    ImportJob.objects.filter(pk=job.pk).update(
+        heartbeat_at=timezone.now(), **job_totals(job, summary)
+    )
+
+
+def run_job(job: ImportJob) -> ImportJob:
+    """
+    Выполняет задачу импорта и сохраняет итоги.
+
+    Строки, обработанные прежними попытками (rows_processed),
+    пропускаются.
+    """
+    importer = IMPORTERS[job.kind]
+    try:
+        with job.file.open("rb") as file:
+            summary = importer(
+                file,
+                encoding=job.encoding,
+                user=job.created_by,
+                errors_limit=JOB_ERRORS_LIMIT,
+                skip_rows=job.rows_processed,
+                progress=lambda summary: report_progress(job, summary),
+                **job.options,
+            )
+    except Exception as exc:
+        logger.exception(f"Импорт {job} завершился ошибкой")
+        job.refresh_from_db(fields=[
+            "rows_processed",
+            "created_count",
+            "updated_count",
+            "errors_count",
+            "errors",
+        ])
+        job.status = ImportJob.Status.FAILED
+        job.failure = str(exc)
+    else:
+        job.status = ImportJob.Status.DONE
+        for name, value in job_totals(job, summary).items():
+            setattr(job, name, value)
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        "status",
+        "failure",
+        "rows_processed",
+        "created_count",
+        "updated_count",
+        "errors_count",
+        "errors",
+        "finished_at",
+    ])
+    logger.info(f"Импорт {job}: {job.rows_processed} строк")
+    return job
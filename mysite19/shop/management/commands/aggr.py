@@ -1,6 +1,5 @@
 
 from django.core.management import BaseCommand
-from django.db.models import Count, Sum
 
 from shop.models import Order
 
@@ -18,14 +17,11 @@ class Command(BaseCommand):
         #     count=Count("id"),
         # )
         # print(result)
-        orders = Order.objects.annotate(
-            total=Sum("products__price", default=0),
-            products_count=Count("products"),
-        )
+        orders = Order.objects.only("pk", "products_count", "total_price")
         for order in orders:
             print(
                 f"Order # {order.id} "
                 f"with {order.products_count}"
-                f"products worth {order.total}"
+                f"products worth {order.total_price}"
             )
         self.stdout.write("Done")
@@ -0,0 +1,96 @@
+import resource
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand
+from django.db import connections, transaction
+
+from shop.common import iter_csv_rows
+from shop.models import Product
+
+INSERT_BATCH = 5000
+
+
+def measure(rows: int):
+    """
+    Создаёт rows товаров внутри транзакции, полностью вычитывает
+    iter_csv_rows() и откатывает транзакцию. Возвращает время,
+    пик памяти Python и пиковый RSS процесса.
+    """
+    columns = {
+        "name": "name",
+        "description": "description",
+        "price": "price",
+        "discount": "discount",
+        "created_by": "created_by__username",
+    }
+    with transaction.atomic():
+        user, created = User.objects.get_or_create(
+            username="bench_csv_export"
+        )
+        for start in range(0, rows, INSERT_BATCH):
+            stop = min(start + INSERT_BATCH, rows)
+            Product.objects.bulk_create([
+                Product(
+                    name=f"Bench product {i}",
+                    description="Benchmark product description",
+                    price=i % 1000,
+                    created_by=user,
+                )
+                for i in range(start, stop)
+            ])
+        queryset = Product.objects.filter(created_by=user)
+
+        tracemalloc.start()
+        started = perf_counter()
+        for chunk in iter_csv_rows(queryset, columns):
+            pass
+        seconds = perf_counter() - started
+        py_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        transaction.set_rollback(True)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return seconds, py_peak, max_rss
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк потоковой выгрузки товаров в CSV.
+
+    Каждый размер каталога замеряется в отдельном дочернем процессе:
+    ru_maxrss - пик за всё время процесса, и в одном процессе
+    меньшие размеры показывали бы пик предыдущих. Данные создаются
+    внутри транзакции, которая откатывается.
+    """
+
+    help = "Measure peak memory of streaming CSV export by row count"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            nargs="+",
+            type=int,
+            default=[10_000, 100_000, 1_000_000],
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start benchmark streaming CSV export")
+        self.stdout.write(
+            f"{'rows':>10} | {'seconds':>8} | "
+            f"{'py peak, KiB':>12} | {'max RSS, KiB':>12}"
+        )
+        for rows in options["rows"]:
+            # Соединение не должно достаться дочернему процессу.
+            connections.close_all()
+            context = get_context("fork")
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                seconds, py_peak, max_rss = pool.submit(measure, rows).result()
+            self.stdout.write(
+                f"{rows:>10} | {seconds:>8.2f} | "
+                f"{py_peak // 1024:>12} | {max_rss:>12}"
+            )
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,118 @@
+from ast import literal_eval
+from csv import DictReader, DictWriter
+from io import BytesIO, StringIO, TextIOWrapper
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from shop.common import save_csv_orders
+from shop.models import Order, Product
+
+
+def legacy_save_csv_orders(file, encoding, user):
+    """
+    Прежняя построчная реализация импорта, только для сравнения.
+    """
+    csv_file = TextIOWrapper(file, encoding=encoding)
+    reader = DictReader(csv_file)
+    with transaction.atomic():
+        for row in reader:
+            order_data = {
+                "delivery_address": row.get("delivery_address", ""),
+                "promo_code": row.get("promo_code", ""),
+                "user": user,
+            }
+            try:
+                products_ids = literal_eval(row.get("products", "[]"))
+                if not isinstance(products_ids, list):
+                    products_ids = []
+            except (SyntaxError, ValueError):
+                products_ids = []
+            order = Order.objects.create(**order_data)
+            if products_ids:
+                products = Product.objects.filter(pk__in=products_ids)
+                order.products.set(products)
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк импорта заказов из CSV: прежний построчный импорт
+    против пакетного save_csv_orders().
+
+    Импорт выполняется без внешней транзакции, чтобы в замер вошли
+    фиксации каждой пачки. Созданные данные удаляются в конце.
+    """
+
+    help = "Compare rows per second of legacy and batched order CSV import"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--products", type=int, default=100)
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start benchmark orders CSV import")
+        rows = options["rows"]
+        user, created = User.objects.get_or_create(
+            username="bench_orders_import"
+        )
+        try:
+            products = Product.objects.bulk_create([
+                Product(name=f"Bench product {i}", price=i, created_by=user)
+                for i in range(options["products"])
+            ])
+            content = self.make_csv(rows, [product.pk for product in products])
+
+            started = perf_counter()
+            legacy_save_csv_orders(BytesIO(content), "utf-8", user)
+            legacy = perf_counter() - started
+
+            started = perf_counter()
+            summary = save_csv_orders(
+                BytesIO(content),
+                "utf-8",
+                user,
+                chunk_size=options["chunk_size"],
+            )
+            batched = perf_counter() - started
+        finally:
+            self.cleanup(user, created)
+
+        self.stdout.write(f"rows: {rows}, errors: {summary['errors_count']}")
+        self.stdout.write(
+            f"legacy:  {legacy:8.2f} s, {rows / legacy:10.0f} rows/s"
+        )
+        self.stdout.write(
+            f"batched: {batched:8.2f} s, {rows / batched:10.0f} rows/s"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Speedup x{legacy / batched:.1f}")
+        )
+
+    def cleanup(self, user: User, created: bool) -> None:
+        """
+        Удаляет заказы и товары бенчмарка (связи защищены PROTECT).
+        """
+        Order.objects.filter(user=user).delete()
+        Product.objects.filter(created_by=user).delete()
+        if created:
+            user.delete()
+
+    def make_csv(self, rows: int, products_ids: list) -> bytes:
+        buffer = StringIO()
+        writer = DictWriter(
+            buffer, fieldnames=["delivery_address", "promo_code", "products"]
+        )
+        writer.writeheader()
+        for i in range(rows):
+            writer.writerow({
+                "delivery_address": f"ul Pupkina, d {i}",
+                "promo_code": "SALE125",
+                "products": str([
+                    products_ids[(i + shift) % len(products_ids)]
+                    for shift in range(3)
+                ]),
+            })
+        return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,103 @@
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.template import engines
+from django.test import RequestFactory
+from django.utils import translation
+
+from shop.models import Product
+from shop.views import ProductsListView
+
+# Прежний шаблон списка: все товары на одной странице.
+LEGACY_TEMPLATE = """{% extends 'shop/base.html' %}
+{% load i18n %}
+{% block body %}
+{% if products|length > 0 %}
+<div>
+    {% blocktrans count products_count=products|length trimmed %}
+    There is only one product.
+    {% plural %}
+    There are {{ products_count }} products.
+    {% endblocktrans %}
+</div>
+<div>
+    {% for product in products %}
+    <div>
+        <h5><a class="best-href" href="{% url 'shop:product_details' pk=product.pk %}">
+            {% blocktrans with name=product.name|upper %}Product: {{ name }}{% endblocktrans %}</a></h5>
+        <span>{% trans "Price:" %} {{ product.price }} |</span>
+        {% trans "no discount" as no_discount %}
+        <span>{% trans "Discount:" %} {% firstof product.discount no_discount %}</span>
+    </div>
+    {% endfor %}
+</div>
+{% endif %}
+{% endblock %}
+"""
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк страницы каталога: прежний рендер всех товаров
+    против постраничного списка с кэшем карточек.
+
+    Данные создаются внутри транзакции, которая откатывается.
+    """
+
+    help = "Compare render time of the legacy and paginated product list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start benchmark products list")
+        translation.activate("en")
+        factory = RequestFactory()
+        with transaction.atomic():
+            user, created = User.objects.get_or_create(
+                username="bench_products_list"
+            )
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        name=f"Bench product {i}",
+                        price=i,
+                        discount=i % 20,
+                        created_by=user,
+                    )
+                    for i in range(options["products"])
+                ],
+                batch_size=5000,
+            )
+
+            legacy_template = engines["django"].from_string(LEGACY_TEMPLATE)
+
+            def legacy():
+                request = factory.get("/shop/products/")
+                request.user = AnonymousUser()
+                products = Product.objects.filter(archived=False)
+                return legacy_template.render({"products": products}, request)
+
+            def paginated():
+                request = factory.get("/shop/products/")
+                request.user = AnonymousUser()
+                response = ProductsListView.as_view()(request)
+                return response.render()
+
+            self.report("legacy", legacy, options["repeat"])
+            # Товары только что созданы, их карточек в кэше ещё нет.
+            self.report("paginated, cold cache", paginated, 1)
+            self.report("paginated, warm cache", paginated, options["repeat"])
+
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def report(self, title: str, render, repeat: int) -> None:
+        started = perf_counter()
+        for _ in range(repeat):
+            render()
+        elapsed = (perf_counter() - started) / repeat
+        self.stdout.write(f"{title:24} {elapsed * 1000:10.1f} ms")
@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.core.management import BaseCommand
+
+from shop.models import Product, ProductImage
+from shop.thumbnails import build_variants, needs_variants
+
+
+class Command(BaseCommand):
+    """
+    Строит уменьшенные копии для уже загруженных изображений товаров
+    (превью и изображений описания), у которых их ещё нет.
+
+    Изображения обрабатываются пачками в пуле процессов.
+    """
+
+    help = "Build thumbnail and WebP variants for existing product images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild variants of all images",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start build image variants")
+        querysets = (
+            Product.objects
+            .exclude(preview="")
+            .exclude(preview__isnull=True)
+            .only("pk", "preview", "preview_variants"),
+            ProductImage.objects.only("pk", "image", "variants"),
+        )
+        built = skipped = 0
+        for queryset in querysets:
+            instances = (
+                instance
+                for instance in queryset.order_by("pk").iterator()
+                if options["force"] or needs_variants(instance)
+            )
+            while batch := list(islice(instances, options["batch_size"])):
+                for _, stored in build_variants(batch):
+                    if stored:
+                        built += 1
+                    else:
+                        skipped += 1
+                self.stdout.write(f"Built {built} images")
+        self.stdout.write(
+            self.style.SUCCESS(f"Done, {built} images, {skipped} skipped")
+        )
@@ -1,7 +1,10 @@
 
 from django.core.management import BaseCommand
+from django.utils import timezone
 
+from mysite19.cache_versions import bump_version
 from shop.models import Product
+from shop.product_cache import evict_products
 
 
 class Command(BaseCommand):
@@ -10,9 +13,12 @@ class Command(BaseCommand):
         # user = User.objects.get(username="admin")
         self.stdout.write("Start demo bulk actions")
 
-        result = Product.objects.filter(
+        products = Product.objects.filter(
             name__contains="Кофе 1",
-        ).update(discount=20)
+        )
+        evict_products(list(products.values_list("pk", flat=True)))
+        result = products.update(discount=20, updated_at=timezone.now())
+        bump_version("products")
         print(result)
         # info = [
         #     ("Кофе 1", 200),
@@ -0,0 +1,129 @@
+import os
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from shop.imaging import variant_name
+from shop.models import Product, ProductImage
+from shop.product_cache import evict_products
+from shop.storage import CAS_PREFIX, product_media_storage
+
+
+class Command(BaseCommand):
+    """
+    Переносит изображения товаров, загруженные до появления
+    shop.storage, в хранилище с адресацией по содержимому.
+
+    Одинаковые файлы сохраняются один раз, готовые уменьшенные копии
+    переносятся вместе с оригиналом. Старые файлы удаляются после
+    того, как на них не осталось ссылок (если не задан --keep-old).
+    """
+
+    help = "Move product images to content-addressed storage and deduplicate"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-old",
+            action="store_true",
+            help="Do not delete files at the old paths",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start migrate product media")
+        self.storage = product_media_storage
+        self.old_names = set()
+        self.old_bytes = self.new_bytes = 0
+        migrated = duplicates = missing = 0
+        for model, field_name, variants_name, product_field in (
+                (Product, "preview", "preview_variants", "pk"),
+                (ProductImage, "image", "variants", "product_id"),
+        ):
+            queryset = (
+                model.objects
+                .exclude(**{f"{field_name}__isnull": True})
+                .exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__startswith": f"{CAS_PREFIX}/"})
+                .only("pk", field_name, variants_name, product_field)
+                .order_by("pk")
+            )
+            for instance in queryset.iterator():
+                old_name = getattr(instance, field_name).name
+                if not self.storage.exists(old_name):
+                    missing += 1
+                    continue
+                new_name, created = self.move(old_name)
+                if not created:
+                    duplicates += 1
+                variants = getattr(instance, variants_name) or {}
+                if variants.get("name") == old_name:
+                    for width in variants["widths"]:
+                        for webp in (False, True):
+                            self.move_variant(old_name, new_name, width, webp)
+                    variants = {**variants, "name": new_name}
+                model.objects.filter(pk=instance.pk).update(
+                    **{field_name: new_name, variants_name: variants}
+                )
+                product_id = getattr(instance, product_field)
+                Product.objects.filter(pk=product_id).update(
+                    updated_at=timezone.now()
+                )
+                evict_products([product_id])
+                migrated += 1
+
+        if not options["keep_old"]:
+            self.delete_unreferenced()
+        self.stdout.write(
+            f"Migrated {migrated} files, {duplicates} duplicates,"
+            f" {missing} missing"
+        )
+        reclaimed = self.old_bytes - self.new_bytes
+        if options["keep_old"]:
+            self.stdout.write(f"Would reclaim {reclaimed} bytes")
+        else:
+            self.stdout.write(f"Reclaimed {reclaimed} bytes")
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def move(self, old_name: str):
+        """
+        Копирует файл в хранилище; занятое место учитывается
+        только для нового содержимого.
+        """
+        with self.storage.open(old_name, "rb") as file:
+            new_name, created = self.storage.store(
+                file, os.path.splitext(old_name)[1]
+            )
+        self.forget(old_name)
+        if created:
+            self.new_bytes += self.storage.size(new_name)
+        return new_name, created
+
+    def move_variant(
+            self, old_name: str, new_name: str, width: int, webp: bool
+    ) -> None:
+        old_variant = variant_name(old_name, width, webp)
+        new_variant = variant_name(new_name, width, webp)
+        if not self.storage.exists(old_variant):
+            return
+        if not self.storage.exists(new_variant):
+            with self.storage.open(old_variant, "rb") as file:
+                self.storage.save(new_variant, file)
+            self.new_bytes += self.storage.size(new_variant)
+        self.forget(old_variant)
+
+    def forget(self, old_name: str) -> None:
+        if old_name not in self.old_names:
+            self.old_names.add(old_name)
+            self.old_bytes += self.storage.size(old_name)
+
+    def delete_unreferenced(self) -> None:
+        referenced = set(
+            Product.objects
+            .filter(preview__in=self.old_names)
+            .values_list("preview", flat=True)
+        ) | set(
+            ProductImage.objects
+            .filter(image__in=self.old_names)
+            .values_list("image", flat=True)
+        )
+        for name in self.old_names - referenced:
+            self.storage.delete(name)
@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+from django.db.models import Max
+
+from shop.models import Order
+from shop.totals import refresh_order_totals
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает денормализованные итоги всех заказов
+    (total_price, products_count).
+
+    Заказы обновляются диапазонами pk, каждый диапазон - один UPDATE.
+    """
+
+    help = "Rebuild stored order totals from order products"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start rebuild order totals")
+        batch_size = options["batch_size"]
+        last_pk = Order.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+        updated = 0
+        for start in range(0, last_pk, batch_size):
+            updated += refresh_order_totals(
+                Order.objects.filter(pk__gt=start, pk__lte=start + batch_size)
+            )
+            self.stdout.write(f"Updated {updated} orders")
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} orders"))
@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand
+
+from mysite19.sitemaps import render_sitemaps
+
+
+class Command(BaseCommand):
+    """
+    Рендерит карты сайта в файлы (SITEMAP_ROOT).
+
+    Перерисовываются только секции, у которых изменились последнее
+    изменение или количество объектов. Запускается по расписанию.
+    """
+
+    help = "Render changed sitemap sections and the sitemap index to files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Render all sections",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start render sitemaps")
+        summary = render_sitemaps(force=options["force"])
+        self.stdout.write(
+            f"Rendered {summary['rendered']}, removed {summary['removed']},"
+            f" unchanged {summary['unchanged']} sections"
+        )
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,49 @@
+from time import sleep
+
+from django.core.management import BaseCommand
+
+from shop.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    """
+    Воркер фоновых импортов CSV.
+
+    Забирает задачи ImportJob из очереди и выполняет их по одной.
+    Можно запускать несколько воркеров одновременно.
+    """
+
+    help = "Run queued CSV import jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the queue and exit instead of polling",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start import jobs worker")
+        try:
+            while True:
+                job = claim_next_job()
+                if job is None:
+                    if options["once"]:
+                        break
+                    sleep(options["poll_interval"])
+                    continue
+                self.stdout.write(f"Run {job}")
+                job = run_job(job)
+                self.stdout.write(
+                    f"Finished {job}: {job.rows_processed} rows,"
+                    f" {job.errors_count} errors"
+                )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management import BaseCommand
+
+from shop.rollups import ROLLUP_BATCH_SIZE, refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    """
+    Обновляет витрины продаж DailySales и MonthlySales.
+
+    Без параметров пересчитывает дни после сохранённой отметки,
+    поэтому команду можно запускать по расписанию (cron).
+    При первом запуске строит витрины по всей истории.
+    """
+
+    help = "Backfill or incrementally refresh sales rollup tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild rollups for the whole order history",
+        )
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Recompute days starting from this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=ROLLUP_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Start sales rollup")
+        summary = refresh_sales_rollups(
+            since=options["since"],
+            full=options["full"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            f"Days {summary['start']} - {summary['end']}:"
+            f" {summary['days']} daily rows, {summary['months']} monthly rows"
+        )
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["search_vector"], name="shop_product_search_gin"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """
+    GIN-индекс и заполнение search_vector только для PostgreSQL.
+
+    Индекс не входит в состояние модели: SQLite при пересоздании
+    таблицы не смог бы его построить.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Product = apps.get_model("shop", "Product")
+    schema_editor.add_index(Product, SEARCH_INDEX)
+    config = settings.SHOP_SEARCH_CONFIG
+    Product.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config=config)
+            + SearchVector("description", weight="B", config=config)
+        )
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Product = apps.get_model("shop", "Product")
+    schema_editor.remove_index(Product, SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0004_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
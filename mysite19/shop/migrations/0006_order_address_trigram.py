@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:43
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+ADDRESS_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(
+            django.db.models.functions.text.Upper("delivery_address"),
+            name="gin_trgm_ops",
+        ),
+        name="shop_order_address_trgm",
+    ),
+    django.contrib.postgres.indexes.HashIndex(
+        fields=["delivery_address"], name="shop_order_address_hash"
+    ),
+]
+
+
+def create_address_indexes(apps, schema_editor):
+    """
+    Триграммный и hash-индексы адреса только для PostgreSQL.
+
+    Индексы не входят в состояние модели: SQLite при пересоздании
+    таблицы не смог бы их построить.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Order = apps.get_model("shop", "Order")
+    for index in ADDRESS_INDEXES:
+        schema_editor.add_index(Order, index)
+
+
+def drop_address_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Order = apps.get_model("shop", "Order")
+    for index in ADDRESS_INDEXES:
+        schema_editor.remove_index(Order, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0005_product_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AlterField(
+            model_name="order",
+            name="delivery_address",
+            field=models.TextField(),
+        ),
+        migrations.RunPython(create_address_indexes, drop_address_indexes),
+    ]
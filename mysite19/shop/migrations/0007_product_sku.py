@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0006_order_address_trigram"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="sku",
+            field=models.CharField(
+                blank=True,
+                help_text="Stock keeping unit, natural key for CSV import",
+                max_length=64,
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
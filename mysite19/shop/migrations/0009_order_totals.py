@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:50
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_order_totals(apps, schema_editor):
+    """
+    Заполняет итоги существующих заказов одним UPDATE.
+    """
+    Order = apps.get_model("shop", "Order")
+    OrderProduct = Order.products.through
+    order_products = (
+        OrderProduct.objects.filter(order_id=OuterRef("pk"))
+        .order_by()
+        .values("order_id")
+    )
+    Order.objects.update(
+        total_price=Coalesce(
+            Subquery(
+                order_products.annotate(total=Sum("product__price")).values("total")
+            ),
+            Value(Decimal(0)),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        products_count=Coalesce(
+            Subquery(order_products.annotate(count=Count("pk")).values("count")),
+            Value(0),
+            output_field=models.IntegerField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0008_import_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="products_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_price",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=12
+            ),
+        ),
+        migrations.RunPython(fill_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:05
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def fill_updated_at(apps, schema_editor):
+    """
+    Существующие товары и заказы считаются изменёнными при создании.
+    """
+    for model_name in ("Product", "Order"):
+        model = apps.get_model("shop", model_name)
+        model.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0010_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0011_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="preview_variants",
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="variants",
+            field=models.JSONField(default=dict, editable=False),
+        ),
+    ]
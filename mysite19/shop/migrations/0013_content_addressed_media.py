@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:07
+
+import shop.models
+import shop.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0012_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="preview",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=shop.storage.ContentAddressedStorage(),
+                upload_to=shop.models.product_preview_directory_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productimage",
+            name="image",
+            field=models.ImageField(
+                storage=shop.storage.ContentAddressedStorage(),
+                upload_to=shop.models.product_images_directory_path,
+            ),
+        ),
+    ]
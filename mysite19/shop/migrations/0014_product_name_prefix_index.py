@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:24
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+NAME_PREFIX_INDEX = models.Index(
+    django.contrib.postgres.indexes.OpClass(
+        django.db.models.functions.text.Upper(
+            django.db.models.functions.comparison.Cast(
+                "name", output_field=models.TextField()
+            )
+        ),
+        name="text_pattern_ops",
+    ),
+    name="shop_product_name_prefix",
+)
+
+
+def create_name_prefix_index(apps, schema_editor):
+    """
+    Индекс для name__istartswith только для PostgreSQL.
+
+    Индекс не входит в состояние модели: SQLite при пересоздании
+    таблицы не смог бы его построить.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Product = apps.get_model("shop", "Product")
+    schema_editor.add_index(Product, NAME_PREFIX_INDEX)
+
+
+def drop_name_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Product = apps.get_model("shop", "Product")
+    schema_editor.remove_index(Product, NAME_PREFIX_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0013_content_addressed_media"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_prefix_index, drop_name_prefix_index),
+    ]
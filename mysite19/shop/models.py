@@ -1,18 +1,27 @@
 """Модели приложения"""
 
+from typing import Optional
+
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxLengthValidator, MaxValueValidator,
                                     MinValueValidator)
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .storage import product_media_storage
+
 
 def product_preview_directory_path(instance: "Product", filename: str) -> str:
     """
     Путь для превью изображения продукта.
+
+    Хранилище сохраняет файл под хэшем содержимого
+    (shop.storage), из пути используется только расширение.
     """
-    return f"products/product_{instance.pk}/preview/{filename}"
+    return f"products/preview/{filename}"
 
 
 class Product(models.Model):
@@ -27,12 +36,35 @@ class Product(models.Model):
         ordering = ["name"]
         verbose_name = _("Product")
         verbose_name_plural = _("Products")
+        indexes = [
+            # Ключи keyset-пагинации API: (поле сортировки, id).
+            models.Index(fields=["name", "id"], name="shop_product_name_id_idx"),
+            models.Index(
+                fields=["price", "id"], name="shop_product_price_id_idx"
+            ),
+            models.Index(
+                fields=["discount", "id"], name="shop_product_discount_id_idx"
+            ),
+            models.Index(
+                fields=["created_at", "id"], name="shop_product_created_id_idx"
+            ),
+        ]
+        # Индексы только для PostgreSQL создаются миграциями и не входят
+        # в состояние модели: GIN по search_vector (0005, shop.search)
+        # и text_pattern_ops по UPPER(name) (0014, shop.autocomplete).
 
     name = models.CharField(
         max_length=100,
         null=False,
         db_index=True
     )
+    sku = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text=_("Stock keeping unit, natural key for CSV import"),
+    )
     description = models.TextField(
         null=False,
         blank=True,
@@ -54,11 +86,19 @@ class Product(models.Model):
         ],
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Для ETag/Last-Modified; пути через update() ставят его явно.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     created_by = models.ForeignKey(User, on_delete=models.PROTECT)
     archived = models.BooleanField(default=False)
     preview = models.ImageField(
-        null=True, blank=True, upload_to=product_preview_directory_path
+        null=True,
+        blank=True,
+        upload_to=product_preview_directory_path,
+        storage=product_media_storage,
     )
+    # Готовые уменьшенные копии превью, см. shop.thumbnails.
+    preview_variants = models.JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def get_absolute_url(self):
         return reverse("shop:product_details", kwargs={"pk": self.pk})
@@ -73,9 +113,9 @@ def product_images_directory_path(
         instance: "ProductImage", filename: str
 ) -> str:
     """
-    Путь для изображений товара.
+    Путь для изображений товара, см. product_preview_directory_path().
     """
-    return f"products/product_{instance.product.pk}/images/{filename}"
+    return f"products/images/{filename}"
 
 
 class ProductImage(models.Model):
@@ -86,7 +126,11 @@ class ProductImage(models.Model):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="images"
     )
-    image = models.ImageField(upload_to=product_images_directory_path)
+    image = models.ImageField(
+        upload_to=product_images_directory_path,
+        storage=product_media_storage,
+    )
+    variants = models.JSONField(default=dict, editable=False)
 
 
 class Order(models.Model):
@@ -99,12 +143,27 @@ class Order(models.Model):
     class Meta:
         verbose_name = _("Order")
         verbose_name_plural = _("Orders")
+        indexes = [
+            # Ключ keyset-пагинации API: (поле сортировки, id).
+            models.Index(
+                fields=["created_at", "id"], name="shop_order_created_id_idx"
+            ),
+        ]
+        # Триграммный GIN-индекс по UPPER(delivery_address) для поиска
+        # (shop.search) и hash-индекс для точного фильтра API создаются
+        # миграцией 0006 только на PostgreSQL.
 
-    delivery_address = models.TextField(null=False, db_index=True)
+    delivery_address = models.TextField(null=False)
     promo_code = models.CharField(max_length=25, null=False, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     user = models.ForeignKey(User, on_delete=models.PROTECT)
     products = models.ManyToManyField(Product, related_name="orders")
+    # Денормализованные итоги, поддерживаются сигналами (см. shop.totals).
+    total_price = models.DecimalField(
+        default=0, max_digits=12, decimal_places=2, editable=False
+    )
+    products_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return (
@@ -112,3 +171,156 @@ class Order(models.Model):
             f" delivery__address={self.delivery_address!r},"
             f" created_at={self.created_at})"
         )
+
+
+def import_jobs_directory_path(instance: "ImportJob", filename: str) -> str:
+    """
+    Путь для файла, загруженного на фоновый импорт.
+    """
+    return f"imports/{instance.kind}/{filename}"
+
+
+class ImportJob(models.Model):
+    """
+    Фоновая задача импорта CSV.
+
+    Создаётся админкой, выполняется командой run_import_jobs.
+    Хранит прогресс и ошибки импорта, heartbeat_at - время последнего
+    отчёта воркера о прогрессе.
+    """
+
+    class Kind(models.TextChoices):
+        PRODUCTS = "products", _("Products")
+        ORDERS = "orders", _("Orders")
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        DONE = "done", _("Done")
+        FAILED = "failed", _("Failed")
+
+    class Meta:
+        ordering = ["-pk"]
+        verbose_name = _("Import job")
+        verbose_name_plural = _("Import jobs")
+        indexes = [
+            models.Index(fields=["status", "id"], name="shop_importjob_queue_idx"),
+        ]
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    file = models.FileField(upload_to=import_jobs_directory_path)
+    encoding = models.CharField(max_length=40, default="utf-8")
+    options = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.PROTECT)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    errors_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    failure = models.TextField(blank=True)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """
+        Скорость импорта, строк в секунду.
+        """
+        if self.started_at is None:
+            return None
+        finished_at = self.finished_at or timezone.now()
+        seconds = (finished_at - self.started_at).total_seconds()
+        if seconds <= 0:
+            return None
+        return self.rows_processed / seconds
+
+    def __str__(self) -> str:
+        return (
+            f"ImportJob(pk={self.pk},"
+            f" kind={self.kind},"
+            f" status={self.status})"
+        )
+
+
+class SalesRollup(models.Model):
+    """
+    Общая часть витрин продаж: итоги по товару и покупателю
+    за период. Заполняется командой sales_rollup (см. shop.rollups).
+    """
+
+    class Meta:
+        abstract = True
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    orders_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(default=0, max_digits=14, decimal_places=2)
+
+
+class DailySales(SalesRollup):
+    """
+    Продажи товара покупателю за день.
+    """
+
+    class Meta:
+        verbose_name = _("Daily sales")
+        verbose_name_plural = _("Daily sales")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "product", "user"],
+                name="shop_dailysales_unique",
+            ),
+        ]
+        indexes = [
+            # Ключ keyset-пагинации API: (поле сортировки, id).
+            models.Index(fields=["day", "id"], name="shop_dailysales_day_id_idx"),
+        ]
+
+    day = models.DateField()
+
+
+class MonthlySales(SalesRollup):
+    """
+    Продажи товара покупателю за месяц (month - первое число месяца).
+    """
+
+    class Meta:
+        verbose_name = _("Monthly sales")
+        verbose_name_plural = _("Monthly sales")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["month", "product", "user"],
+                name="shop_monthlysales_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["month", "id"], name="shop_monthlysales_month_id_idx"
+            ),
+        ]
+
+    month = models.DateField()
+
+
+class RollupWatermark(models.Model):
+    """
+    До какого момента Order.created_at витрина уже пересчитана.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"RollupWatermark(name={self.name!r}, value={self.value})"
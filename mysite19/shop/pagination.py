@@ -0,0 +1,333 @@
+"""
+Keyset-пагинация для REST API и HTML-списков магазина.
+
+Страница выбирается условием по паре (поле сортировки, pk) вместо
+OFFSET и без COUNT(*), поэтому стоимость запроса не зависит от номера
+страницы. В API поле сортировки берётся из OrderingFilter
+представления (KeysetPagination), в списках ListView задаётся
+атрибутами KeysetListMixin.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from typing import Any, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import Http404, QueryDict
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.request import Request
+
+from .search import SEARCH_RANK
+
+
+def keyset_filter(
+        field: str, descending: bool, position: Tuple[Any, Any]
+) -> Q:
+    """
+    Условие "строго после граничной записи" в порядке сортировки.
+
+    Условие field >= value даёт диапазон для индекса (field, id),
+    остальная часть отсекает записи с тем же значением поля.
+    """
+    value, pk = position
+    after = "lt" if descending else "gt"
+    if field == "pk":
+        return Q(**{f"pk__{after}": pk})
+    return Q(**{f"{field}__{after}e": value}) & (
+        Q(**{f"{field}__{after}": value}) | Q(**{f"pk__{after}": pk})
+    )
+
+
+def keyset_position(instance: Any, field: str) -> Tuple[str, Any]:
+    """
+    Значение поля сортировки (строкой) и pk граничной записи.
+    """
+    if isinstance(instance, dict):
+        value, pk = instance[field], instance["pk"]
+    else:
+        value, pk = getattr(instance, field), instance.pk
+    return str(value), pk
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная пагинация по ключу (поле сортировки, pk).
+
+    Курсор хранит значения поля сортировки и pk граничной записи,
+    некорректный курсор даёт ответ 400. Для каждого поля
+    из ordering_fields представления должен быть составной индекс
+    (поле, id), см. Meta.indexes моделей.
+    """
+
+    ordering = "pk"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(
+            self, queryset: QuerySet, request: Request, view: Any = None
+    ) -> Optional[List[Any]]:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.decode_position(self.cursor)
+
+        field, descending = self.ordering
+        if reverse:
+            descending = not descending
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}pk")
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_position_filter(field, descending, position)
+                )
+            except (TypeError, ValueError, ValidationError):
+                # Значение курсора не приводится к типу поля.
+                raise ParseError(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        if self.page:
+            self.previous_position = self.get_position(self.page[0])
+            self.next_position = self.get_position(self.page[-1])
+        else:
+            self.previous_position = self.next_position = None
+            self.has_next = self.has_previous = False
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_page_state(self) -> dict:
+        """
+        Состояние текущей страницы, достаточное для построения ссылок.
+
+        Используется кэшем списков: по нему restore_page_state()
+        восстанавливает ответ без запроса к базе.
+        """
+        return {
+            "has_next": self.has_next,
+            "has_previous": self.has_previous,
+            "next_position": self.next_position,
+            "previous_position": self.previous_position,
+        }
+
+    def restore_page_state(self, request: Request, state: dict) -> None:
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def get_ordering(
+            self, request: Request, queryset: QuerySet, view: Any
+    ) -> Tuple[str, bool]:
+        """
+        Поле сортировки и её направление.
+
+        Используется первое поле из OrderingFilter, pk добавляется
+        в ключ автоматически. Результаты полнотекстового поиска
+        без явного ?ordering= сортируются по убыванию ранга.
+
+        Returns:
+            Кортеж (имя поля, по убыванию).
+        """
+        if (
+                SEARCH_RANK in queryset.query.annotations
+                and OrderingFilter.ordering_param not in request.query_params
+        ):
+            return SEARCH_RANK, True
+        ordering = super().get_ordering(request, queryset, view)
+        field = ordering[0]
+        descending = field.startswith("-")
+        field = field.lstrip("-")
+        if field == "id":
+            field = "pk"
+        return field, descending
+
+    def get_position_filter(
+            self, field: str, descending: bool, position: Tuple[Any, Any]
+    ) -> Q:
+        return keyset_filter(field, descending, position)
+
+    def get_position(self, instance: Any) -> str:
+        return json.dumps(keyset_position(instance, self.ordering[0]))
+
+    def decode_cursor(self, request: Request) -> Optional[Cursor]:
+        try:
+            return super().decode_cursor(request)
+        except NotFound:
+            raise ParseError(self.invalid_cursor_message)
+
+    def decode_position(
+            self, cursor: Optional[Cursor]
+    ) -> Optional[Tuple[Any, Any]]:
+        if cursor is None or cursor.position is None:
+            return None
+        try:
+            value, pk = json.loads(cursor.position)
+        except (TypeError, ValueError):
+            raise ParseError(self.invalid_cursor_message)
+        return value, pk
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        cursor = Cursor(offset=0, reverse=False, position=self.next_position)
+        return self.encode_cursor(cursor)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        cursor = Cursor(
+            offset=0, reverse=True, position=self.previous_position
+        )
+        return self.encode_cursor(cursor)
+
+
+class KeysetPage:
+    """
+    Страница HTML-списка без номера и общего количества.
+
+    Ссылки на соседние страницы сохраняют остальные параметры
+    адреса (размер страницы, фильтры) и заменяют только курсор.
+    """
+
+    def __init__(
+            self,
+            object_list: List[Any],
+            query_params: QueryDict,
+            cursor_kwarg: str,
+            cursor: str,
+            page_size: int,
+            has_next: bool,
+            has_previous: bool,
+            next_cursor: Optional[str],
+            previous_cursor: Optional[str],
+    ) -> None:
+        self.object_list = object_list
+        self.query_params = query_params
+        self.cursor_kwarg = cursor_kwarg
+        self.cursor = cursor
+        self.page_size = page_size
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def cursor_query(self, cursor: str) -> str:
+        params = self.query_params.copy()
+        params[self.cursor_kwarg] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self) -> str:
+        return self.cursor_query(self.next_cursor)
+
+    @property
+    def previous_query(self) -> str:
+        return self.cursor_query(self.previous_cursor)
+
+
+class KeysetListMixin:
+    """
+    Постраничный вывод ListView по ключу (keyset_field, pk).
+
+    Размер страницы берётся из ?page_size= (не больше
+    max_paginate_by), граница страницы - из ?cursor=. Для
+    keyset_field нужен составной индекс (поле, id). Некорректный
+    курсор даёт 404, как несуществующий номер страницы в ListView.
+    """
+
+    paginate_by = 20
+    max_paginate_by = 100
+    page_size_kwarg = "page_size"
+    cursor_kwarg = "cursor"
+    keyset_field = "pk"
+    keyset_descending = False
+
+    def get_paginate_by(self, queryset: Any) -> int:
+        try:
+            page_size = int(self.request.GET[self.page_size_kwarg])
+        except (KeyError, ValueError):
+            return self.paginate_by
+        return min(max(page_size, 1), self.max_paginate_by)
+
+    def encode_cursor(self, reverse: bool, instance: Any) -> str:
+        position = keyset_position(instance, self.keyset_field)
+        raw = json.dumps([reverse, *position]).encode()
+        return urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor: str) -> Tuple[bool, Tuple[Any, Any]]:
+        try:
+            reverse, value, pk = json.loads(urlsafe_b64decode(cursor))
+        except (BinasciiError, TypeError, ValueError):
+            raise Http404("Invalid cursor")
+        return bool(reverse), (value, pk)
+
+    def paginate_queryset(
+            self, queryset: QuerySet, page_size: int
+    ) -> Tuple[None, KeysetPage, List[Any], bool]:
+        field = self.keyset_field
+        cursor = self.request.GET.get(self.cursor_kwarg, "")
+        reverse, position = False, None
+        if cursor:
+            reverse, position = self.decode_cursor(cursor)
+
+        descending = self.keyset_descending != reverse
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}pk")
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    keyset_filter(field, descending, position)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise Http404("Invalid cursor")
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        first, last = (rows[0], rows[-1]) if rows else (None, None)
+        page = KeysetPage(
+            rows,
+            self.request.GET,
+            self.cursor_kwarg,
+            cursor,
+            page_size,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=rows and self.encode_cursor(False, last),
+            previous_cursor=rows and self.encode_cursor(True, first),
+        )
+        return None, page, rows, page.has_other_pages()
@@ -0,0 +1,253 @@
+"""
+Кэш сериализованных товаров для API.
+
+Представление товара (ProductSerializer) хранится в кэше по pk.
+Запись обновляется при сохранении товара (post_save) и в путях без
+сигналов (queryset.update(), bulk_create) после фиксации транзакции,
+поэтому кэш не отдаёт устаревших данных и не нуждается в коротком
+таймауте. Промахи чтения заполняются через cache.add: читатель,
+прочитавший строку до фиксации изменения, не перезапишет запись,
+сделанную после фиксации.
+
+Списки товаров кэшируются отдельно: по каноническому ключу
+параметров запроса хранятся только pk товаров страницы и состояние
+пагинации, строки берутся из кэша товаров через get_many.
+Запись списка содержит версию каталога ("products",
+см. mysite19.cache_versions) и читается вместе со счётчиком версии
+одним get_many, поэтому горячая страница стоит двух обращений
+к кэшу и ни одного SQL-запроса.
+
+Счётчики попаданий и промахов копятся в процессе и сбрасываются
+в общий кэш каждые PRODUCT_CACHE_STATS_FLUSH обращений, чтобы
+чтение товара оставалось одним GET.
+"""
+
+from functools import partial
+from hashlib import sha1
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import QueryDict
+
+from mysite19.cache_versions import bump_version, get_version, version_key
+
+from .models import Product
+from .serializers import ProductSerializer
+
+PRODUCT_CACHE_PREFIX = "product"
+PRODUCT_LIST_CACHE_PREFIX = "products_list"
+PRODUCT_CACHE_STATS_FLUSH = 100
+PRODUCT_CACHE_REFRESH_BATCH = 500
+
+_stats = {"hits": 0, "misses": 0}
+
+
+def product_cache_key(pk: int) -> str:
+    return f"{PRODUCT_CACHE_PREFIX}:{pk}"
+
+
+def serialize_product(product: Product) -> dict:
+    """
+    Представление товара для кэша.
+
+    Сериализуется без запроса, поэтому ссылка на превью
+    относительная; абсолютная строится при чтении.
+    """
+    return dict(ProductSerializer(product).data)
+
+
+def cache_product(product: Product) -> dict:
+    """
+    Записывает товар в кэш после фиксации транзакции.
+
+    Returns:
+        Записанное представление товара.
+    """
+    data = serialize_product(product)
+    transaction.on_commit(
+        lambda: cache.set(
+            product_cache_key(product.pk),
+            data,
+            timeout=settings.SHOP_PRODUCT_CACHE_TIMEOUT,
+        )
+    )
+    return data
+
+
+def fill_product_cache(product: Product) -> dict:
+    """
+    Кладёт в кэш товар, прочитанный при промахе.
+
+    Запись не перезаписывает уже сохранённую: её мог записать
+    писатель после фиксации более новой версии строки.
+
+    Returns:
+        Представление товара.
+    """
+    data = serialize_product(product)
+    cache.add(
+        product_cache_key(product.pk),
+        data,
+        timeout=settings.SHOP_PRODUCT_CACHE_TIMEOUT,
+    )
+    return data
+
+
+def evict_products(pks: Iterable[int]) -> None:
+    """
+    Удаляет товары из кэша сразу, а после фиксации транзакции
+    записывает их заново из базы (удалённые - удаляет).
+
+    Запись после фиксации не даёт читателю, прочитавшему строку
+    до фиксации, вернуть в кэш старую версию: его cache.add
+    не перезапишет существующую запись. Версия каталога тоже
+    увеличивается: от неё зависят ETag списков товаров.
+    """
+    pks = list(pks)
+    if not pks:
+        return
+    cache.delete_many([product_cache_key(pk) for pk in pks])
+    transaction.on_commit(partial(refresh_products, pks))
+    bump_version("products")
+
+
+def refresh_products(pks: List[int]) -> None:
+    """
+    Перезаписывает товары в кэше текущими данными из базы.
+    """
+    for start in range(0, len(pks), PRODUCT_CACHE_REFRESH_BATCH):
+        batch = pks[start:start + PRODUCT_CACHE_REFRESH_BATCH]
+        loaded = {
+            product_cache_key(product.pk): serialize_product(product)
+            for product in Product.objects.filter(pk__in=batch)
+        }
+        cache.set_many(loaded, timeout=settings.SHOP_PRODUCT_CACHE_TIMEOUT)
+        cache.delete_many([
+            key for key in map(product_cache_key, batch)
+            if key not in loaded
+        ])
+
+
+def get_cached_product(pk: int) -> Optional[dict]:
+    """
+    Представление товара из кэша или None.
+    """
+    data = cache.get(product_cache_key(pk))
+    _count("hits" if data is not None else "misses")
+    return data
+
+
+def get_cached_products(pks: List[int]) -> Dict[int, dict]:
+    """
+    Представления товаров по pk: из кэша одним get_many,
+    отсутствующие - одним запросом к базе с записью в кэш
+    (fill_product_cache).
+
+    Returns:
+        pk -> представление; удалённых товаров в результате нет.
+    """
+    keys = {product_cache_key(pk): pk for pk in pks}
+    found = cache.get_many(list(keys))
+    result = {keys[key]: data for key, data in found.items()}
+    if result:
+        _count("hits", len(result))
+    missing = [pk for pk in pks if pk not in result]
+    if missing:
+        _count("misses", len(missing))
+        for product in Product.objects.filter(pk__in=missing):
+            result[product.pk] = fill_product_cache(product)
+    return result
+
+
+def product_list_cache_key(params: QueryDict, names: Iterable[str]) -> str:
+    """
+    Ключ списка товаров, не зависящий от порядка параметров запроса.
+
+    В ключ входят только параметры names - те, что читают фильтры
+    и пагинатор (поиск, фильтры, сортировка, курсор, размер
+    страницы); остальные, например сброс кэша браузера, не создают
+    новых ключей. Параметры сортируются по имени, а значения
+    повторяющегося параметра сохраняют порядок: фильтры берут
+    последнее. Параметр только с пустыми значениями отбрасывается.
+    """
+    canonical = [
+        (name, params.getlist(name)) for name in sorted(set(names))
+    ]
+    canonical = [(name, values) for name, values in canonical if any(values)]
+    digest = sha1(repr(canonical).encode()).hexdigest()
+    return f"{PRODUCT_LIST_CACHE_PREFIX}:{digest}"
+
+
+def get_product_list(key: str) -> Tuple[int, Optional[dict]]:
+    """
+    Запись списка товаров, если она построена для текущей версии каталога.
+
+    Returns:
+        Текущая версия каталога и запись списка или None.
+    """
+    products_version_key = version_key("products")
+    found = cache.get_many([products_version_key, key])
+    version = found.get(products_version_key)
+    if version is None:
+        return get_version("products"), None
+    entry = found.get(key)
+    if entry is None or entry["version"] != version:
+        return version, None
+    return version, entry
+
+
+def set_product_list(
+        key: str, version: int, pks: List[int], page: dict
+) -> None:
+    """
+    Сохраняет pk товаров страницы и состояние пагинации.
+    """
+    cache.set(
+        key,
+        {"version": version, "pks": pks, "page": page},
+        timeout=settings.SHOP_PRODUCT_LIST_CACHE_TIMEOUT,
+    )
+
+
+def _count(outcome: str, value: int = 1) -> None:
+    _stats[outcome] += value
+    if sum(_stats.values()) >= PRODUCT_CACHE_STATS_FLUSH:
+        flush_stats()
+
+
+def _stats_key(outcome: str) -> str:
+    return f"{PRODUCT_CACHE_PREFIX}:stats:{outcome}"
+
+
+def flush_stats() -> None:
+    """
+    Переносит счётчики процесса в общий кэш.
+    """
+    for outcome, value in _stats.items():
+        if not value:
+            continue
+        key = _stats_key(outcome)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            if not cache.add(key, value, timeout=None):
+                cache.incr(key, value)
+        _stats[outcome] = 0
+
+
+def get_product_cache_stats() -> Dict[str, float]:
+    """
+    Счётчики попаданий и промахов всех процессов.
+    """
+    flush_stats()
+    found = cache.get_many([_stats_key(outcome) for outcome in _stats])
+    hits = found.get(_stats_key("hits"), 0)
+    misses = found.get(_stats_key("misses"), 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+    }
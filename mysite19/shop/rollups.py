@@ -0,0 +1,174 @@
+"""
+Витрины продаж по дням и месяцам.
+
+DailySales и MonthlySales хранят количество заказов и выручку
+по (период, товар, покупатель), чтобы отчёты не агрегировали
+всю таблицу связей заказов с товарами.
+
+Витрины обновляются инкрементально: пересчитываются только дни
+начиная с сохранённой отметки Order.created_at минус окно
+SHOP_SALES_ROLLUP_LOOKBACK (заказы, закоммиченные позже отметки
+или изменённые вскоре после создания). Каждый день и месяц
+пересчитывается целиком, поэтому повторный запуск безопасен.
+Выручка считается по текущей цене товара, как Order.total_price.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .common import iter_chunks
+from .models import DailySales, MonthlySales, Order, RollupWatermark
+
+ROLLUP_WATERMARK = "sales"
+ROLLUP_BATCH_SIZE = 1000
+
+
+def day_start(day: date) -> datetime:
+    """
+    Начало дня в текущем часовом поясе.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def iter_months(start: date, end: date) -> Iterator[Tuple[date, date]]:
+    """
+    Делит период [start, end] на отрезки внутри календарных месяцев.
+    """
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        yield start, min(end, next_month - timedelta(days=1))
+        start = next_month
+
+
+def rebuild_daily_sales(
+        start: date, end: date, batch_size: int = ROLLUP_BATCH_SIZE
+) -> int:
+    """
+    Пересчитывает DailySales за дни [start, end] одной транзакцией.
+
+    Returns:
+        Количество созданных строк витрины.
+    """
+    rows = (
+        Order.products.through.objects
+        .filter(
+            order__created_at__gte=day_start(start),
+            order__created_at__lt=day_start(end + timedelta(days=1)),
+        )
+        .annotate(day=TruncDate("order__created_at"))
+        .values("day", "product_id", "order__user_id")
+        .annotate(orders_count=Count("order_id"), revenue=Sum("product__price"))
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        DailySales.objects.filter(day__gte=start, day__lte=end).delete()
+        for chunk in iter_chunks(rows.iterator(batch_size), batch_size):
+            DailySales.objects.bulk_create([
+                DailySales(
+                    day=row["day"],
+                    product_id=row["product_id"],
+                    user_id=row["order__user_id"],
+                    orders_count=row["orders_count"],
+                    revenue=row["revenue"],
+                )
+                for row in chunk
+            ])
+            created += len(chunk)
+    return created
+
+
+def rebuild_monthly_sales(
+        start: date, end: date, batch_size: int = ROLLUP_BATCH_SIZE
+) -> int:
+    """
+    Пересчитывает MonthlySales за месяцы, в которые попадают
+    дни [start, end], из дневной витрины.
+
+    Returns:
+        Количество созданных строк витрины.
+    """
+    first_month = start.replace(day=1)
+    last_day = (end.replace(day=1) + timedelta(days=32)).replace(day=1)
+    rows = (
+        DailySales.objects
+        .filter(day__gte=first_month, day__lt=last_day)
+        .annotate(month=TruncMonth("day"))
+        .values("month", "product_id", "user_id")
+        .annotate(
+            total_orders=Sum("orders_count"), total_revenue=Sum("revenue")
+        )
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        MonthlySales.objects.filter(
+            month__gte=first_month, month__lt=last_day
+        ).delete()
+        for chunk in iter_chunks(rows.iterator(batch_size), batch_size):
+            MonthlySales.objects.bulk_create([
+                MonthlySales(
+                    month=row["month"],
+                    product_id=row["product_id"],
+                    user_id=row["user_id"],
+                    orders_count=row["total_orders"],
+                    revenue=row["total_revenue"],
+                )
+                for row in chunk
+            ])
+            created += len(chunk)
+    return created
+
+
+def refresh_sales_rollups(
+        since: Optional[date] = None,
+        full: bool = False,
+        batch_size: int = ROLLUP_BATCH_SIZE,
+) -> dict:
+    """
+    Обновляет витрины продаж и сдвигает отметку.
+
+    Args:
+        since: Пересчитать начиная с этого дня вместо отметки.
+        full: Перестроить витрины по всей истории заказов.
+        batch_size: Размер одного INSERT.
+
+    Returns:
+        Итоги: start, end, days (строк DailySales), months
+        (строк MonthlySales).
+    """
+    now = timezone.now()
+    end = timezone.localdate(now)
+    watermark = RollupWatermark.objects.filter(name=ROLLUP_WATERMARK).first()
+    if since is not None:
+        start = since
+    elif full or watermark is None:
+        first_order = Order.objects.aggregate(first=Min("created_at"))["first"]
+        start = timezone.localdate(first_order) if first_order else end
+    else:
+        lookback = timedelta(seconds=settings.SHOP_SALES_ROLLUP_LOOKBACK)
+        start = timezone.localdate(watermark.value - lookback)
+
+    summary = {"start": start, "end": end, "days": 0, "months": 0}
+    if full:
+        # Строки за дни до первого заказа остались от удалённых заказов.
+        DailySales.objects.filter(day__lt=start).delete()
+        MonthlySales.objects.filter(month__lt=start.replace(day=1)).delete()
+    # Транзакции по месяцам, чтобы не держать блокировки на всю историю.
+    for month_start, month_end in iter_months(start, end):
+        summary["days"] += rebuild_daily_sales(
+            month_start, month_end, batch_size
+        )
+        summary["months"] += rebuild_monthly_sales(
+            month_start, month_end, batch_size
+        )
+    RollupWatermark.objects.update_or_create(
+        name=ROLLUP_WATERMARK, defaults={"value": now}
+    )
+    return summary
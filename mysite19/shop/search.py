@@ -0,0 +1,149 @@
+"""
+Поиск по товарам и заказам.
+
+На PostgreSQL товары ищутся полнотекстово по сохранённой колонке
+Product.search_vector, а заказы - по триграммному GIN-индексу
+Order.delivery_address, с ранжированием результатов. На других СУБД
+(SQLite в тестах) используется обычный поиск SearchFilter/ModelAdmin
+через icontains.
+"""
+
+from typing import Any
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector,
+                                            TrigramWordSimilarity)
+from django.db import connection
+from django.db.models import DecimalField, Expression, F, Q, QuerySet
+from django.db.models.functions import Cast, Upper
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+
+SEARCH_RANK = "search_rank"
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+
+def full_text_search_available() -> bool:
+    """
+    Доступен ли полнотекстовый и триграммный поиск на текущей СУБД.
+    """
+    return connection.vendor == "postgresql"
+
+
+def product_search_vector() -> SearchVector:
+    """
+    Выражение для колонки search_vector: название важнее описания.
+    """
+    config = settings.SHOP_SEARCH_CONFIG
+    return (
+        SearchVector("name", weight="A", config=config)
+        + SearchVector("description", weight="B", config=config)
+    )
+
+
+def refresh_search_vector(queryset: QuerySet) -> int:
+    """
+    Пересчитывает search_vector для товаров из queryset одним UPDATE.
+
+    Нужен для путей, которые не вызывают сигналы (bulk_create, update).
+
+    Returns:
+        Количество обновлённых товаров.
+    """
+    if not full_text_search_available():
+        return 0
+    return queryset.update(search_vector=product_search_vector())
+
+
+def rounded_rank(rank: Expression) -> Cast:
+    """
+    Ранг, округлённый в SQL до numeric(12, 6).
+
+    ts_rank и word_similarity возвращают float4, текст которого
+    в Python не равен значению в базе. Курсор KeysetPagination хранит
+    ранг строкой, поэтому сортировка и сравнение идут по numeric:
+    записи с равным рангом на границе страницы не теряются.
+    """
+    return Cast(rank, RANK_FIELD)
+
+
+def search_products(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Фильтрует товары по поисковой строке и добавляет ранг совпадения.
+
+    Строка разбирается как websearch_to_tsquery: поддерживаются
+    кавычки, "or" и минус для исключения слова.
+    """
+    query = SearchQuery(
+        text, search_type="websearch", config=settings.SHOP_SEARCH_CONFIG
+    )
+    return (
+        queryset
+        .filter(search_vector=query)
+        .annotate(**{
+            SEARCH_RANK: rounded_rank(SearchRank(F("search_vector"), query))
+        })
+    )
+
+
+def search_orders(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Нечёткий поиск заказов по адресу доставки.
+
+    Находит адреса, содержащие строку без учёта регистра, и адреса
+    с похожими словами (опечатки). Оба условия обслуживает триграммный
+    GIN-индекс по UPPER(delivery_address).
+    Ранг - сходство строки с наиболее похожим фрагментом адреса.
+    """
+    return (
+        queryset
+        .alias(delivery_address_upper=Upper("delivery_address"))
+        .filter(
+            Q(delivery_address_upper__contains=text.upper())
+            | Q(delivery_address_upper__trigram_word_similar=text)
+        )
+        .annotate(**{
+            SEARCH_RANK: rounded_rank(
+                TrigramWordSimilarity(text, "delivery_address")
+            )
+        })
+    )
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    SearchFilter с полнотекстовым поиском по товарам.
+
+    Результаты получают аннотацию search_rank, по которой
+    KeysetPagination сортирует выдачу, если не задан ?ordering=.
+    """
+
+    def filter_queryset(
+            self, request: Request, queryset: QuerySet, view: Any
+    ) -> QuerySet:
+        if not full_text_search_available():
+            return super().filter_queryset(request, queryset, view)
+        terms = " ".join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        return search_products(queryset, terms)
+
+
+class OrderSearchFilter(SearchFilter):
+    """
+    SearchFilter с триграммным поиском заказов по адресу доставки.
+
+    Результаты упорядочиваются по сходству (search_rank),
+    если не задан ?ordering=.
+    """
+
+    def filter_queryset(
+            self, request: Request, queryset: QuerySet, view: Any
+    ) -> QuerySet:
+        if not full_text_search_available():
+            return super().filter_queryset(request, queryset, view)
+        terms = " ".join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        return search_orders(queryset, terms)
@@ -6,26 +6,65 @@
 
 from rest_framework import serializers
 
-from .models import Order, Product
+from .imaging import image_variants
+from .models import DailySales, MonthlySales, Order, Product
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Product."""
 
+    preview_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = (
             "pk",
+            "sku",
             "name",
             "description",
             "price",
             "discount",
             "created_at",
+            "updated_at",
             "created_by",
             "archived",
             "preview",
+            "preview_variants",
         )
 
+    def get_preview_variants(self, product: Product) -> list:
+        """
+        Уменьшенные копии превью для srcset: ширина, ссылки
+        на копию в формате оригинала и на копию WebP.
+
+        Как и preview, ссылки абсолютные, если в контексте есть
+        запрос.
+        """
+        request = self.context.get("request")
+
+        def build_url(url: str) -> str:
+            if request is None:
+                return url
+            return request.build_absolute_uri(url)
+
+        return [
+            {
+                "width": variant.width,
+                "url": build_url(variant.url),
+                "webp": build_url(variant.webp_url),
+            }
+            for variant in image_variants(
+                product.preview, product.preview_variants
+            )
+        ]
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """Сериализатор запроса на импорт товаров из CSV."""
+
+    file = serializers.FileField()
+    upsert = serializers.BooleanField(default=False)
+
 
 class OrderSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Order."""
@@ -37,6 +76,40 @@ class OrderSerializer(serializers.ModelSerializer):
             "delivery_address",
             "promo_code",
             "created_at",
+            "updated_at",
             "user",
             "products",
+            "total_price",
+            "products_count",
+        )
+        read_only_fields = ("total_price", "products_count")
+
+
+class DailySalesSerializer(serializers.ModelSerializer):
+    """Сериализатор витрины продаж по дням."""
+
+    class Meta:
+        model = DailySales
+        fields = (
+            "pk",
+            "day",
+            "product",
+            "user",
+            "orders_count",
+            "revenue",
+        )
+
+
+class MonthlySalesSerializer(serializers.ModelSerializer):
+    """Сериализатор витрины продаж по месяцам."""
+
+    class Meta:
+        model = MonthlySales
+        fields = (
+            "pk",
+            "month",
+            "product",
+            "user",
+            "orders_count",
+            "revenue",
         )
@@ -0,0 +1,255 @@
+"""
+Обработчики сигналов моделей магазина.
+
+Увеличивают версии кэша при изменении товаров и заказов
+и поддерживают денормализованные итоги заказов.
+"""
+
+from django.db.models import Sum
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from mysite19.cache_versions import bump_version
+
+from .models import Order, Product, ProductImage
+from .product_cache import cache_product, evict_products
+from .search import refresh_search_vector
+from .thumbnails import needs_variants, schedule_variants
+from .totals import (add_order_products, refresh_order_totals,
+                     shift_product_price)
+
+
+def bump_order_versions(*owner_ids: int) -> None:
+    """
+    Сбрасывает кэш заказов владельцев и общую версию заказов
+    ("orders"), по которой строится ETag списка заказов API.
+    """
+    bump_version("orders")
+    for owner_id in set(owner_ids):
+        bump_version("orders", owner_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_products(sender, instance: Product, **kwargs) -> None:
+    """
+    Сбрасывает кэш каталога при изменении или удалении товара.
+    """
+    bump_version("products")
+
+
+@receiver(post_save, sender=Product)
+def write_product_cache(sender, instance: Product, **kwargs) -> None:
+    """
+    Обновляет закэшированное представление товара.
+    """
+    if kwargs.get("raw"):
+        return
+    cache_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def evict_product_cache(sender, instance: Product, **kwargs) -> None:
+    """
+    Удаляет товар из кэша после удаления.
+    """
+    evict_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(
+        sender, instance: Product, update_fields=None, **kwargs
+) -> None:
+    """
+    Пересчитывает поисковый вектор после сохранения товара.
+    """
+    if kwargs.get("raw"):
+        return
+    if update_fields and not {"name", "description"} & set(update_fields):
+        return
+    refresh_search_vector(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_price(sender, instance: Product, **kwargs) -> None:
+    """
+    Запоминает прежнюю цену товара перед сохранением.
+    """
+    if instance.pk is None or kwargs.get("raw"):
+        instance._previous_price = None
+        return
+    instance._previous_price = (
+        Product.objects
+        .filter(pk=instance.pk)
+        .values_list("price", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_totals_on_price_change(
+        sender, instance: Product, created: bool, **kwargs
+) -> None:
+    """
+    Переносит изменение цены товара в итоги заказов с этим товаром.
+    """
+    previous_price = getattr(instance, "_previous_price", None)
+    if created or previous_price is None:
+        return
+    if previous_price != instance.price:
+        shift_product_price(instance.pk, previous_price, instance.price)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_orders(sender, instance: Product, **kwargs) -> None:
+    """
+    Запоминает заказы удаляемого товара: связи удаляются каскадом
+    без сигнала m2m_changed.
+    """
+    instance._order_ids = list(instance.orders.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def update_totals_on_product_delete(
+        sender, instance: Product, **kwargs
+) -> None:
+    """
+    Пересчитывает итоги заказов, из которых удалён товар.
+    """
+    order_ids = getattr(instance, "_order_ids", None)
+    if order_ids:
+        refresh_order_totals(Order.objects.filter(pk__in=order_ids))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product_on_image_change(
+        sender, instance: ProductImage, **kwargs
+) -> None:
+    """
+    Отмечает товар изменённым при изменении его изображений,
+    чтобы страница товара не отдавалась ответом 304.
+    """
+    if kwargs.get("raw"):
+        return
+    Product.objects.filter(pk=instance.product_id).update(
+        updated_at=timezone.now()
+    )
+    evict_products([instance.product_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+def build_image_variants(sender, instance, **kwargs) -> None:
+    """
+    Ставит в очередь уменьшенные копии нового или заменённого
+    изображения товара.
+    """
+    if kwargs.get("raw"):
+        return
+    if needs_variants(instance):
+        schedule_variants(instance)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_owner(sender, instance: Order, **kwargs) -> None:
+    """
+    Запоминает прежнего владельца заказа перед сохранением.
+    """
+    if instance.pk is None or kwargs.get("raw"):
+        instance._previous_user_id = None
+        return
+    instance._previous_user_id = (
+        Order.objects
+        .filter(pk=instance.pk)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_owner_orders(sender, instance: Order, **kwargs) -> None:
+    """
+    Сбрасывает кэш заказов владельца (и прежнего владельца).
+    """
+    previous_user_id = getattr(instance, "_previous_user_id", None)
+    if previous_user_id:
+        bump_order_versions(instance.user_id, previous_user_id)
+    else:
+        bump_order_versions(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def invalidate_order_products(
+        sender, instance, action: str, reverse: bool, pk_set, **kwargs
+) -> None:
+    """
+    Сбрасывает кэш заказов при изменении состава заказа.
+
+    При изменении со стороны товара (product.orders) затрагиваются
+    владельцы всех изменённых заказов.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_order_versions(instance.user_id)
+        return
+
+    if action == "pre_clear":
+        instance._cleared_owner_ids = set(
+            instance.orders.values_list("user_id", flat=True)
+        )
+        return
+    if action == "post_clear":
+        owner_ids = getattr(instance, "_cleared_owner_ids", set())
+    elif action in ("post_add", "post_remove"):
+        owner_ids = set(
+            Order.objects
+            .filter(pk__in=pk_set)
+            .values_list("user_id", flat=True)
+        )
+    else:
+        return
+    bump_order_versions(*owner_ids)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def update_order_totals(
+        sender, instance, action: str, reverse: bool, pk_set, **kwargs
+) -> None:
+    """
+    Поддерживает итоги заказов при изменении их состава.
+
+    Добавление товаров в заказ увеличивает итоги на их стоимость,
+    в остальных случаях итоги затронутых заказов пересчитываются.
+    """
+    if not reverse:
+        orders = Order.objects.filter(pk=instance.pk)
+        if action == "post_add" and pk_set:
+            total = Product.objects.filter(pk__in=pk_set).aggregate(
+                total=Sum("price", default=0)
+            )["total"]
+            add_order_products(orders, total, len(pk_set))
+        elif action in ("post_remove", "post_clear"):
+            refresh_order_totals(orders)
+        else:
+            return
+        # Иначе последующий order.save() затрёт итоги старыми значениями.
+        instance.refresh_from_db(fields=["total_price", "products_count"])
+        return
+
+    if action == "pre_clear":
+        instance._cleared_order_ids = list(
+            instance.orders.values_list("pk", flat=True)
+        )
+        return
+    if action == "post_clear":
+        order_ids = getattr(instance, "_cleared_order_ids", [])
+    elif action in ("post_add", "post_remove"):
+        order_ids = pk_set
+    else:
+        return
+    if order_ids:
+        refresh_order_totals(Order.objects.filter(pk__in=order_ids))
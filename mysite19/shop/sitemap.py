@@ -1,14 +1,14 @@
-from django.contrib.sitemaps import Sitemap
+from django.db.models import QuerySet
+
+from mysite19.sitemap_sections import SectionSitemap
 
 from .models import Product
 
 
-class ShopSitemap(Sitemap):
+class ShopSitemap(SectionSitemap):
+    model = Product
     changefreq = "daily"
     priority = 0.8
 
-    def items(self):
-        return Product.objects.filter(archived=False)
-
-    def lastmod(self, obj: Product):
-        return obj.created_at
\ No newline at end of file
+    def get_queryset(self) -> QuerySet:
+        return super().get_queryset().filter(archived=False)
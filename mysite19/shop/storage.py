@@ -0,0 +1,100 @@
+"""
+Хранилище медиафайлов товаров с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 своего содержимого:
+cas/ab/cd/abcd...ef.jpg. Хэш считается по частям в том же проходе,
+в котором файл пишется во временный, поэтому повторного чтения нет.
+Одинаковые загрузки получают одно имя и хранятся один раз, а имя
+файла никогда не меняется, пока не изменится содержимое.
+
+Имена внутри cas/, которые передаются явно, сохраняются как есть:
+так хранятся производные файлы (уменьшенные копии, shop.thumbnails),
+имя которых выводится из имени оригинала. Поэтому копии строятся
+только для оригиналов внутри cas/ (is_content_addressed()).
+
+Файл может быть общим для нескольких товаров, поэтому удалять его
+через поле модели нельзя.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Tuple
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = "cas"
+
+
+def is_content_addressed(name: str) -> bool:
+    """
+    Лежит ли файл внутри cas/, то есть сохраняется ли под своим именем.
+    """
+    return name.startswith(f"{CAS_PREFIX}/")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage, сохраняющий загрузки под хэшем содержимого.
+
+    Из имени, полученного от upload_to, используется только расширение.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def _save(self, name: str, content: File) -> str:
+        if is_content_addressed(name):
+            return super()._save(name, content)
+        name, created = self.store(content, os.path.splitext(name)[1])
+        return name
+
+    def store(self, content: File, extension: str = "") -> Tuple[str, bool]:
+        """
+        Сохраняет содержимое под его хэшем.
+
+        Args:
+            content: Файл, читается один раз по частям.
+            extension: Расширение имени, например ".jpg".
+
+        Returns:
+            Имя файла в хранилище и признак того, что файл новый
+            (False - такое содержимое уже хранилось).
+        """
+        tmp_dir = self.path(f"{CAS_PREFIX}/tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+            name = self.hashed_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.unlink(tmp_path)
+                return name, False
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return name, True
+
+    @staticmethod
+    def hashed_name(hexdigest: str, extension: str = "") -> str:
+        return (
+            f"{CAS_PREFIX}/{hexdigest[:2]}/{hexdigest[2:4]}/"
+            f"{hexdigest}{extension.lower()}"
+        )
+
+
+product_media_storage = ContentAddressedStorage()
@@ -0,0 +1,51 @@
+"""
+Теги шаблонов для изображений товаров с уменьшенными копиями.
+"""
+
+from django import template
+from django.db.models.fields.files import FieldFile
+
+from shop.imaging import image_variants
+
+register = template.Library()
+
+
+def srcset(variants, webp: bool = False) -> str:
+    return ", ".join(
+        f"{variant.webp_url if webp else variant.url} {variant.width}w"
+        for variant in variants
+    )
+
+
+@register.inclusion_tag("shop/picture.html")
+def picture(
+        file: FieldFile,
+        variants: dict,
+        width: int,
+        sizes: str = "",
+        alt: str = "",
+) -> dict:
+    """
+    Тег <picture> с WebP и srcset по готовым копиям изображения.
+
+    Пока копии не построены, выводится оригинал.
+
+    Args:
+        file: Файл изображения (product.preview, image.image).
+        variants: Поле копий (product.preview_variants, image.variants).
+        width: Ширина отображения; src - наименьшая копия не уже неё.
+        sizes: Атрибут sizes, по умолчанию "<width>px".
+        alt: Альтернативный текст.
+    """
+    ready = image_variants(file, variants)
+    src = next(
+        (variant.url for variant in ready if variant.width >= width),
+        file.url,
+    )
+    return {
+        "src": src,
+        "srcset": srcset(ready),
+        "webp_srcset": srcset(ready, webp=True),
+        "sizes": sizes or f"{width}px",
+        "alt": alt,
+    }
@@ -1,2 +1,949 @@
+from base64 import b64encode
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from mysite19.cache_versions import bump_version, get_version
+from mysite19.nplusone import NPlusOneError, detect_n_plus_one, query_shape
+from mysite19.smoke import URLSmokeTestMixin
+
+from . import urls, views
+from .common import save_csv_orders, save_csv_products
+from .jobs import claim_next_job, run_job
+from .models import DailySales, ImportJob, MonthlySales, Order, Product
+from .product_cache import (evict_products, fill_product_cache,
+                            get_cached_product, product_cache_key)
+from .rollups import refresh_sales_rollups
+from .serializers import ProductSerializer
+from .storage import product_media_storage
+from .thumbnails import needs_variants, store_variants
+from .totals import refresh_order_totals
+
+
+def product_queries(queries: CaptureQueriesContext) -> list:
+    """
+    Запросы к таблице товаров (без запросов сессии и пользователя).
+    """
+    return [
+        query["sql"] for query in queries.captured_queries
+        if "shop_product" in query["sql"]
+    ]
+
+
+class CacheVersionTestCase(TestCase):
+    """
+    Версии кэша и выгрузки, которые от них зависят.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer")
+        cls.product = Product.objects.create(
+            name="Coffee", price=100, created_by=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(translation.override("en"))
+
+    def test_bump_waits_for_commit(self):
+        version = get_version("products")
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version("products")
+            self.assertEqual(get_version("products"), version)
+        self.assertNotEqual(get_version("products"), version)
+
+    def export_names(self):
+        response = self.client.get(reverse("shop:products-export"))
+        return [row["name"] for row in response.json()["products"]]
+
+    def test_products_export_sees_new_product(self):
+        self.assertEqual(self.export_names(), ["Coffee"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Tea", price=50, created_by=self.user)
+        self.assertEqual(self.export_names(), ["Coffee", "Tea"])
+
+    def test_owner_export_sees_order_products_change(self):
+        order = Order.objects.create(delivery_address="Street", user=self.user)
+        url = reverse(
+            "shop:owner_orders_export", kwargs={"user_id": self.user.pk}
+        )
+        orders = self.client.get(url).json()["orders"]
+        self.assertEqual(orders[0]["products"], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            order.products.add(self.product)
+        orders = self.client.get(url).json()["orders"]
+        self.assertEqual(
+            [product["name"] for product in orders[0]["products"]], ["Coffee"]
+        )
+
+
+class ProductCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        cls.product = Product.objects.create(
+            name="Coffee", price=100, created_by=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(translation.override("en"))
+        self.client.force_login(self.user)
+        self.url = reverse(
+            "shop:product-detail", kwargs={"pk": self.product.pk}
+        )
+
+    def test_retrieve_fills_cache_on_miss(self):
+        self.assertEqual(self.client.get(self.url).data["name"], "Coffee")
+        cached = get_cached_product(self.product.pk)
+        self.assertEqual(cached["name"], "Coffee")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(product_queries(queries), [])
+
+    def test_miss_does_not_overwrite_newer_entry(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        cache.set(product_cache_key(self.product.pk), {"name": "Newer"})
+        fill_product_cache(stale)
+        self.assertEqual(get_cached_product(self.product.pk)["name"], "Newer")
+
+    def test_save_updates_cache_after_commit(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Tea"
+            self.product.save()
+        self.assertEqual(self.client.get(self.url).data["name"], "Tea")
+
+    def test_update_without_signals_refreshes_cache(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            evict_products([self.product.pk])
+            Product.objects.filter(pk=self.product.pk).update(name="Tea")
+            self.assertIsNone(get_cached_product(self.product.pk))
+        self.assertEqual(get_cached_product(self.product.pk)["name"], "Tea")
+
+    def test_delete_evicts_product(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).delete()
+        self.assertIsNone(get_cached_product(self.product.pk))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class OrderTotalsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer")
+        cls.coffee = Product.objects.create(
+            name="Coffee", price=100, created_by=cls.user
+        )
+        cls.tea = Product.objects.create(
+            name="Tea", price=50, created_by=cls.user
+        )
+
+    def setUp(self):
+        self.order = Order.objects.create(
+            delivery_address="Street", user=self.user
+        )
+
+    def assertTotals(self, total_price, products_count):
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(
+            (order.total_price, order.products_count),
+            (total_price, products_count),
+        )
+
+    def test_add_and_remove(self):
+        self.order.products.add(self.coffee, self.tea)
+        self.assertTotals(150, 2)
+        self.order.products.remove(self.coffee)
+        self.assertTotals(50, 1)
+        self.order.products.clear()
+        self.assertTotals(0, 0)
+
+    def test_add_from_product_side(self):
+        self.coffee.orders.add(self.order)
+        self.assertTotals(100, 1)
+        self.coffee.orders.clear()
+        self.assertTotals(0, 0)
+
+    def test_save_after_add_keeps_totals(self):
+        self.order.products.add(self.coffee)
+        self.order.promo_code = "SALE"
+        self.order.save()
+        self.assertTotals(100, 1)
+
+    def test_price_change(self):
+        self.order.products.add(self.coffee, self.tea)
+        self.coffee.price = 120
+        self.coffee.save()
+        self.assertTotals(170, 2)
+
+    def test_product_delete(self):
+        self.order.products.add(self.coffee, self.tea)
+        self.tea.delete()
+        self.assertTotals(100, 1)
+
+    def test_refresh_after_bulk_changes(self):
+        Order.products.through.objects.bulk_create([
+            Order.products.through(order=self.order, product=self.coffee),
+            Order.products.through(order=self.order, product=self.tea),
+        ])
+        self.assertTotals(0, 0)
+        refresh_order_totals(Order.objects.filter(pk=self.order.pk))
+        self.assertTotals(150, 2)
+
+
+class SalesRollupsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer")
+        cls.coffee = Product.objects.create(
+            name="Coffee", price=100, created_by=cls.user
+        )
+        cls.tea = Product.objects.create(
+            name="Tea", price=50, created_by=cls.user
+        )
+
+    def create_order(self, days_ago, *products):
+        order = Order.objects.create(delivery_address="Street", user=self.user)
+        order.products.set(products)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return order
+
+    def daily(self):
+        return sorted(
+            DailySales.objects.values_list(
+                "product__name", "orders_count", "revenue"
+            )
+        )
+
+    def test_full_rebuild(self):
+        self.create_order(40, self.coffee)
+        self.create_order(40, self.coffee, self.tea)
+        self.create_order(1, self.tea)
+        refresh_sales_rollups(full=True)
+        self.assertEqual(self.daily(), [
+            ("Coffee", 2, Decimal("200.00")),
+            ("Tea", 1, Decimal("50.00")),
+            ("Tea", 1, Decimal("50.00")),
+        ])
+        monthly = MonthlySales.objects.values_list("orders_count", "revenue")
+        self.assertEqual(sum(count for count, _ in monthly), 4)
+        self.assertEqual(
+            sum(revenue for _, revenue in monthly), Decimal("300.00")
+        )
+
+    def test_incremental_refresh(self):
+        self.create_order(40, self.coffee)
+        refresh_sales_rollups()
+        self.create_order(0, self.tea)
+        summary = refresh_sales_rollups()
+        # Пересчитываются только дни после отметки минус окно.
+        self.assertGreater(
+            summary["start"], timezone.localdate() - timedelta(days=40)
+        )
+        self.assertEqual(self.daily(), [
+            ("Coffee", 1, Decimal("100.00")),
+            ("Tea", 1, Decimal("50.00")),
+        ])
+
+    def test_refresh_is_idempotent(self):
+        self.create_order(3, self.coffee, self.tea)
+        refresh_sales_rollups(full=True)
+        rows = self.daily()
+        refresh_sales_rollups(full=True)
+        self.assertEqual(self.daily(), rows)
+
+    def test_full_rebuild_drops_deleted_orders(self):
+        old = self.create_order(40, self.coffee)
+        self.create_order(1, self.tea)
+        refresh_sales_rollups(full=True)
+        old.delete()
+        refresh_sales_rollups(full=True)
+        self.assertEqual(self.daily(), [("Tea", 1, Decimal("50.00"))])
+
+
+def csv_file(*lines):
+    return BytesIO("\n".join(lines).encode())
+
+
+class CSVImportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer")
+        cls.coffee = Product.objects.create(
+            name="Coffee", sku="C-1", price=100, created_by=cls.user
+        )
+
+    def test_products(self):
+        summary = save_csv_products(csv_file(
+            "sku,name,description,price,discount",
+            "T-1,Tea,Green,50,0",
+            "C-1,Coffee,Dark,120,0",
+            "M-1,Milk,,abc,0",
+            "W-1,Water,,10,0",
+        ), "utf-8", self.user, chunk_size=2)
+        self.assertEqual(
+            (summary["rows"], summary["created"], summary["updated"]),
+            (4, 2, 0),
+        )
+        self.assertEqual(
+            [error["row"] for error in summary["errors"]], [3, 4]
+        )
+        self.assertEqual(
+            Product.objects.get(sku="C-1").price, Decimal("100.00")
+        )
+        self.assertTrue(Product.objects.filter(sku="W-1").exists())
+
+    def test_products_upsert_updates_order_totals(self):
+        order = Order.objects.create(delivery_address="Street", user=self.user)
+        order.products.add(self.coffee)
+        summary = save_csv_products(csv_file(
+            "sku,name,description,price,discount",
+            "C-1,Coffee,Dark,120,0",
+        ), "utf-8", self.user, upsert=True)
+        self.assertEqual((summary["created"], summary["updated"]), (0, 1))
+        self.assertEqual(
+            Product.objects.get(sku="C-1").price, Decimal("120.00")
+        )
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal("120.00"))
+
+    def test_orders(self):
+        summary = save_csv_orders(csv_file(
+            "delivery_address,promo_code,products",
+            f"Street 1,,[{self.coffee.pk}]",
+            "Street 2,,[999999]",
+            ",,[]",
+            f'Street 3,SALE,"[{self.coffee.pk}, {self.coffee.pk}]"',
+            "Street 4,,oops",
+        ), "utf-8", self.user, chunk_size=2)
+        self.assertEqual((summary["rows"], summary["created"]), (5, 2))
+        self.assertEqual(
+            sorted(error["row"] for error in summary["errors"]), [3, 4, 6]
+        )
+        order = Order.objects.get(delivery_address="Street 3")
+        self.assertEqual(order.promo_code, "SALE")
+        self.assertEqual(list(order.products.all()), [self.coffee])
+        self.assertEqual(
+            (order.total_price, order.products_count),
+            (Decimal("100.00"), 1),
+        )
+
+    def test_errors_are_counted_beyond_limit(self):
+        lines = [",,[]"] * 5
+        summary = save_csv_orders(
+            csv_file("delivery_address,promo_code,products", *lines),
+            "utf-8", self.user, chunk_size=2, errors_limit=3,
+        )
+        self.assertEqual(summary["errors_count"], 5)
+        self.assertEqual(
+            [error["row"] for error in summary["errors"]], [2, 3, 4]
+        )
+
+    def test_progress_after_each_chunk(self):
+        progress = []
+        save_csv_products(
+            csv_file(
+                "sku,name,description,price,discount",
+                *(f"S-{index},Product {index},,1,0" for index in range(5)),
+            ),
+            "utf-8", self.user, chunk_size=2,
+            progress=lambda summary: progress.append(summary["rows"]),
+        )
+        self.assertEqual(progress, [2, 4, 5])
+
+
+@override_settings(SHOP_IMPORT_JOB_LEASE=60, SHOP_IMPORT_JOB_MAX_ATTEMPTS=2)
+class ImportJobQueueTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="admin")
+
+    def setUp(self):
+        media_root = self.enterContext(TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def create_job(self, *lines, **fields):
+        content = "\n".join(("sku,name,description,price,discount", *lines))
+        job = ImportJob(
+            kind=ImportJob.Kind.PRODUCTS, created_by=self.user, **fields
+        )
+        job.file.save("products.csv", ContentFile(content.encode()))
+        return job
+
+    def test_claim_once(self):
+        job = self.create_job()
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(
+            (claimed.status, claimed.attempts), (ImportJob.Status.RUNNING, 1)
+        )
+        self.assertIsNone(claim_next_job())
+
+    def test_stale_job_is_claimed_again(self):
+        job = self.create_job()
+        claim_next_job()
+        self.assertIsNone(claim_next_job())
+        ImportJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=61)
+        )
+        self.assertEqual(claim_next_job().attempts, 2)
+
+    def test_job_fails_after_max_attempts(self):
+        job = self.create_job(
+            status=ImportJob.Status.RUNNING,
+            attempts=2,
+            heartbeat_at=timezone.now() - timedelta(seconds=61),
+        )
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+
+    def test_run_resumes_after_saved_rows(self):
+        job = self.create_job(
+            *(f"S-{index},Product {index},,1,0" for index in range(4)),
+            status=ImportJob.Status.RUNNING,
+            heartbeat_at=timezone.now() - timedelta(seconds=61),
+            rows_processed=2,
+            created_count=2,
+        )
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual((job.rows_processed, job.created_count), (4, 4))
+        self.assertEqual(
+            sorted(Product.objects.values_list("sku", flat=True)),
+            ["S-2", "S-3"],
+        )
+
+    def test_errors_are_bounded(self):
+        self.create_job(*(f"S-{index},,,1,0" for index in range(5)))
+        with mock.patch("shop.jobs.JOB_ERRORS_LIMIT", 2):
+            job = run_job(claim_next_job())
+        self.assertEqual(job.errors_count, 5)
+        self.assertEqual([error["row"] for error in job.errors], [2, 3])
+
+
+class ImageVariantsTestCase(TestCase):
+    rendered = [(320, b"jpeg", b"webp")]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer")
+
+    def setUp(self):
+        media_root = self.enterContext(TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def create_product(self, preview):
+        return Product.objects.create(
+            name="Coffee", created_by=self.user, preview=preview
+        )
+
+    def test_variants_named_after_original(self):
+        name = "cas/ab/cd/abcd.jpg"
+        product = self.create_product(name)
+        self.assertTrue(needs_variants(product))
+
+        stored = store_variants(Product, product.pk, name, self.rendered)
+        self.assertTrue(stored)
+
+        product.refresh_from_db()
+        self.assertEqual(
+            product.preview_variants, {"name": name, "widths": [320]}
+        )
+        for variant in ("cas/ab/cd/abcd_320w.jpg", "cas/ab/cd/abcd_320w.webp"):
+            self.assertTrue(product_media_storage.exists(variant))
+
+    def test_serializer_urls_are_absolute(self):
+        name = "cas/ab/cd/abcd.jpg"
+        product = self.create_product(name)
+        product.preview_variants = {"name": name, "widths": [320]}
+        request = RequestFactory().get("/")
+        data = ProductSerializer(product, context={"request": request}).data
+        urls = [data["preview"]] + [
+            variant[key]
+            for variant in data["preview_variants"]
+            for key in ("url", "webp")
+        ]
+        self.assertEqual(len(urls), 3)
+        for url in urls:
+            self.assertTrue(url.startswith("http://testserver/"), url)
+
+    def test_legacy_original_is_refused(self):
+        name = "products/product_1/preview/photo.jpg"
+        product = self.create_product(name)
+        self.assertFalse(needs_variants(product))
+
+        with self.assertRaises(ValueError):
+            store_variants(Product, product.pk, name, self.rendered)
+
+        product.refresh_from_db()
+        self.assertEqual(product.preview_variants, {})
+        self.assertFalse(product_media_storage.exists("cas"))
+
+
+class PaginatedInlineTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        cls.order = Order.objects.create(
+            delivery_address="Street", user=cls.user
+        )
+        cls.order.products.set([
+            Product.objects.create(
+                name=f"Product {index}", created_by=cls.user
+            )
+            for index in range(25)
+        ])
+        cls.url = reverse("admin:shop_order_change", args=[cls.order.pk])
+
+    def test_page_links_keep_query(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {
+            "_changelist_filters": "q=Street", "Order_products-page": 2,
+        })
+        self.assertContains(
+            response,
+            'href="?_changelist_filters=q%3DStreet&amp;Order_products-page=1"',
+        )
+        self.assertContains(response, "Page 2 of 2")
+
+    def test_save_and_continue_keeps_page(self):
+        request = RequestFactory().post(
+            f"{self.url}?_changelist_filters=q%3DStreet&Order_products-page=2",
+            {"_continue": "1"},
+        )
+        request.user = self.user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        response = admin.site._registry[Order].response_change(
+            request, self.order
+        )
+        self.assertEqual(
+            response.url,
+            f"{self.url}?_changelist_filters=q%3DStreet&Order_products-page=2",
+        )
+
+
+class ConditionalListTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        cls.product = Product.objects.create(
+            name="Coffee", price=100, created_by=cls.user
+        )
+        cls.order = Order.objects.create(
+            delivery_address="Street", user=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(translation.override("en"))
+        self.client.force_login(self.user)
+
+    def assertNotModified(self, url, **params):
+        etag = self.client.get(url, params).headers["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if "shop_" in query["sql"]
+        ])
+        return etag
+
+    def assertModified(self, url, etag, **params):
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_list(self):
+        url = reverse("shop:product-list")
+        etag = self.assertNotModified(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Tea", price=50, created_by=self.user)
+        self.assertModified(url, etag)
+
+    def test_product_list_depends_on_params(self):
+        url = reverse("shop:product-list")
+        etag = self.assertNotModified(url, ordering="price")
+        self.assertModified(url, etag, ordering="-price")
+
+    def test_product_list_keeps_repeated_value_order(self):
+        Product.objects.create(name="Tea", price=50, created_by=self.user)
+        url = reverse("shop:product-list")
+        for names, expected in ((("Coffee", "Tea"), "Tea"),
+                                (("Tea", "Coffee"), "Coffee")):
+            with self.subTest(names=names):
+                response = self.client.get(url, {"name": names})
+                self.assertEqual(
+                    [product["name"] for product in response.data["results"]],
+                    [expected],
+                )
+
+    def test_product_list_ignores_unknown_params(self):
+        url = reverse("shop:product-list")
+        etag = self.client.get(url, {"ordering": "price"}).headers["ETag"]
+        response = self.client.get(url, {"ordering": "price", "_": "1"})
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_product_list_sees_update_without_signals(self):
+        url = reverse("shop:product-list")
+        etag = self.assertNotModified(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(name="Tea")
+            evict_products([self.product.pk])
+        self.assertModified(url, etag)
+
+    def test_order_list(self):
+        url = reverse("shop:order-list")
+        etag = self.assertNotModified(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.products.add(self.product)
+        self.assertModified(url, etag)
+
+    def test_order_list_sees_price_change(self):
+        self.order.products.add(self.product)
+        url = reverse("shop:order-list")
+        etag = self.assertNotModified(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 120
+            self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data["results"][0]["total_price"], "120.00")
+
+
+class KeysetPaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        # Одинаковые цены, чтобы граница страницы попадала внутрь группы.
+        for index in range(7):
+            Product.objects.create(
+                name=f"Product {index}", price=10 + index // 3,
+                created_by=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(translation.override("en"))
+        self.client.force_login(self.user)
+        self.url = reverse("shop:product-list")
+
+    def walk(self, url, link):
+        names = []
+        while url:
+            data = self.client.get(url).json()
+            names.extend(product["name"] for product in data["results"])
+            url = data[link]
+        return names
+
+    def test_ties_are_not_skipped(self):
+        names = self.walk(f"{self.url}?ordering=price&page_size=2", "next")
+        self.assertEqual(names, [f"Product {index}" for index in range(7)])
+
+    def test_descending_walk(self):
+        names = self.walk(f"{self.url}?ordering=-price&page_size=2", "next")
+        self.assertEqual(
+            names, [f"Product {index}" for index in (6, 5, 4, 3, 2, 1, 0)]
+        )
+
+    def test_previous_pages(self):
+        url = f"{self.url}?ordering=price&page_size=3"
+        for _ in range(2):
+            url = self.client.get(url).json()["next"]
+        data = self.client.get(url).json()
+        names = self.walk(data["previous"], "previous")
+        self.assertEqual(
+            names, [f"Product {index}" for index in (3, 4, 5, 0, 1, 2)]
+        )
+
+    def cursor(self, position):
+        query = urlencode({"o": 0, "r": 0, "p": position})
+        return b64encode(query.encode()).decode()
+
+    def test_invalid_cursor_value(self):
+        response = self.client.get(self.url, {
+            "ordering": "price", "cursor": self.cursor('["abc", 1]'),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_cursor(self):
+        for cursor in ("garbage", self.cursor("not json")):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+
+
+class ProductsListViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        # Повторяющиеся имена: граница страницы внутри группы.
+        cls.products = [
+            Product.objects.create(
+                name=f"Product {index // 3}", created_by=cls.user
+            )
+            for index in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(translation.override("en"))
+        self.client.force_login(self.user)
+        self.url = reverse("shop:products")
+
+    def walk(self, query, link):
+        pks = []
+        while query is not None:
+            response = self.client.get(f"{self.url}?{query}")
+            page = response.context["page_obj"]
+            pks.extend(product.pk for product in response.context["products"])
+            has_link = getattr(page, f"has_{link}")
+            query = getattr(page, f"{link}_query") if has_link else None
+        return pks
+
+    def test_walk_without_offset(self):
+        with CaptureQueriesContext(connection) as queries:
+            pks = self.walk("page_size=2", "next")
+        self.assertEqual(pks, [product.pk for product in self.products])
+        self.assertFalse(
+            [sql for sql in product_queries(queries) if "OFFSET" in sql]
+        )
+
+    def test_previous_pages(self):
+        response = self.client.get(self.url, {"page_size": 3})
+        for _ in range(2):
+            query = response.context["page_obj"].next_query
+            response = self.client.get(f"{self.url}?{query}")
+        page = response.context["page_obj"]
+        pks = self.walk(page.previous_query, "previous")
+        self.assertEqual(
+            pks, [self.products[index].pk for index in (3, 4, 5, 0, 1, 2)]
+        )
+
+    def test_count_is_capped(self):
+        with mock.patch.object(
+                views.ProductsListView, "products_count_limit", 5
+        ):
+            response = self.client.get(self.url)
+        self.assertContains(response, "There are more than 5 products.")
+        response = self.client.get(self.url)
+        self.assertContains(response, "There are 7 products.")
+
+    def test_invalid_cursor(self):
+        for cursor in ("garbage", "WyJhYmMiXQ=="):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class OrderListViewsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        cls.orders = [
+            Order.objects.create(delivery_address="Street", user=cls.user)
+            for _ in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(translation.override("en"))
+        self.client.force_login(self.user)
+
+    def walk(self, url):
+        pks, query = [], "page_size=2"
+        with CaptureQueriesContext(connection) as queries:
+            while query is not None:
+                response = self.client.get(f"{url}?{query}")
+                page = response.context["page_obj"]
+                pks.extend(order.pk for order in page.object_list)
+                query = page.next_query if page.has_next else None
+        sql = [
+            query["sql"] for query in queries.captured_queries
+            if "shop_order" in query["sql"]
+        ]
+        self.assertFalse([query for query in sql if "COUNT(" in query])
+        self.assertFalse([query for query in sql if "OFFSET" in query])
+        return pks
+
+    def test_newest_first(self):
+        newest_first = [order.pk for order in reversed(self.orders)]
+        for url in (
+                reverse("shop:orders"),
+                reverse("shop:user_orders", kwargs={"user_id": self.user.pk}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url), newest_first)
+
+    def test_user_orders_cached_per_cursor(self):
+        url = reverse("shop:user_orders", kwargs={"user_id": self.user.pk})
+        first = self.client.get(url, {"page_size": 2})
+        query = first.context["page_obj"].next_query
+        second = self.client.get(f"{url}?{query}")
+        self.assertContains(first, f"# {self.orders[-1].pk}")
+        self.assertNotContains(second, f"# {self.orders[-1].pk}")
+        self.assertContains(second, f"# {self.orders[-3].pk}")
+
+
+class QueryShapeTestCase(TestCase):
+    def test_parameters_do_not_change_shape(self):
+        self.assertEqual(
+            query_shape('SELECT "a" FROM "t" WHERE "id" = 1 LIMIT 21'),
+            query_shape('SELECT "a" FROM "t" WHERE "id" = 25 LIMIT 21'),
+        )
+        self.assertEqual(
+            query_shape("SELECT * FROM \"t\" WHERE \"name\" = 'it''s'"),
+            query_shape("SELECT * FROM \"t\" WHERE \"name\" = 'x'"),
+        )
+
+    def test_in_list_length_does_not_change_shape(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s)'),
+        )
+
+    def test_different_tables_have_different_shapes(self):
+        self.assertNotEqual(
+            query_shape('SELECT * FROM "a" WHERE "id" = %s'),
+            query_shape('SELECT * FROM "b" WHERE "id" = %s'),
+        )
+
+
+class NPlusOneDetectorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer")
+        for index in range(3):
+            Order.objects.create(
+                delivery_address=f"Street {index}", user=cls.user
+            )
+
+    def test_repeated_shape_raises_with_origin(self):
+        with self.assertRaises(NPlusOneError) as error:
+            with detect_n_plus_one(threshold=3, raise_error=True):
+                for order in Order.objects.all():
+                    order.user.username
+        self.assertIn(__file__, str(error.exception))
+
+    def test_repeated_shape_below_threshold(self):
+        with detect_n_plus_one(threshold=4, raise_error=True) as counter:
+            for order in Order.objects.all():
+                order.user.username
+        self.assertEqual(max(counter.counts.values()), 3)
+
+    def test_select_related_passes(self):
+        with detect_n_plus_one(threshold=2, raise_error=True):
+            for order in Order.objects.select_related("user"):
+                order.user.username
+
+
+class OrderViewSetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        products = [
+            Product.objects.create(
+                name=f"Product {index}", created_by=cls.user
+            )
+            for index in range(3)
+        ]
+        for index in range(10):
+            order = Order.objects.create(
+                delivery_address=f"Street {index}", user=cls.user
+            )
+            order.products.set(products[:index % 3 + 1])
+
+    def setUp(self):
+        self.enterContext(translation.override("en"))
+        self.client.force_login(self.user)
+
+    def test_list_queries_do_not_depend_on_orders(self):
+        url = reverse("shop:order-list")
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(url, {"page_size": 2})
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(url, {"page_size": 10})
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(len(small_page), len(large_page))
+
+    def test_list_products(self):
+        response = self.client.get(
+            reverse("shop:order-list"), {"page_size": 10}
+        )
+        counts = [
+            len(order["products"]) for order in response.data["results"]
+        ]
+        self.assertEqual(sorted(counts), [1, 1, 1, 1, 2, 2, 2, 3, 3, 3])
+
+    def test_retrieve_invalid_pk(self):
+        for pk in ("abc", "999999"):
+            with self.subTest(pk=pk):
+                response = self.client.get(
+                    reverse("shop:order-detail", kwargs={"pk": pk})
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class ShopURLsTestCase(URLSmokeTestMixin, TestCase):
+    urlconf = urls
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin")
+        Group.objects.create(name="Managers")
+        cls.products = [
+            Product.objects.create(
+                name=f"Product {index}",
+                description="Description",
+                price=10 + index,
+                created_by=cls.user,
+            )
+            for index in range(5)
+        ]
+        cls.orders = []
+        for index in range(5):
+            order = Order.objects.create(
+                delivery_address=f"Street {index}", user=cls.user
+            )
+            order.products.set(cls.products[:index + 1])
+            cls.orders.append(order)
+        refresh_sales_rollups(full=True)
+
+    def get_url_kwargs(self):
+        product = {"pk": self.products[0].pk}
+        order = {"pk": self.orders[0].pk}
+        user = {"user_id": self.user.pk}
+        return {
+            "product-detail": product,
+            "product_details": product,
+            "product_update": product,
+            "product_archive": product,
+            "order-detail": order,
+            "order_details": order,
+            "order_update": order,
+            "order_delete": order,
+            "user_orders": user,
+            "owner_orders_export": user,
+            "dailysales-detail": {"pk": DailySales.objects.first().pk},
+            "monthlysales-detail": {"pk": MonthlySales.objects.first().pk},
+        }
@@ -0,0 +1,223 @@
+"""
+Уменьшенные копии изображений товаров.
+
+Для каждой ширины из SHOP_THUMBNAIL_WIDTHS рядом с оригиналом
+сохраняются копия в формате оригинала и копия WebP:
+photo.jpg -> photo_320w.jpg, photo_320w.webp.
+
+Копии строятся в пуле процессов (shop.imaging) после фиксации
+транзакции, в которой загружено изображение, и не задерживают ответ.
+Готовые ширины записываются в поле модели вместе с именем оригинала
+(Product.preview_variants, ProductImage.variants): копии старого
+файла после замены изображения не используются.
+
+Копии строятся только для оригиналов в cas/ (shop.storage): другое
+имя хранилище заменило бы хэшем, и файла с именем копии не было бы.
+Изображения, загруженные раньше, сначала переносит команда
+migrate_media_storage.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from threading import Lock
+from typing import List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, models, transaction
+from django.utils import timezone
+from loguru import logger
+
+from .imaging import RenderedVariant, render_variants, variant_name
+from .models import Product, ProductImage
+from .product_cache import evict_products
+from .storage import is_content_addressed
+
+# Поле изображения и поле с готовыми копиями для каждой модели.
+IMAGE_FIELDS = {
+    Product: ("preview", "preview_variants"),
+    ProductImage: ("image", "variants"),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = Lock()
+_pending = set()
+
+
+def needs_variants(instance: models.Model) -> bool:
+    """
+    Есть ли у объекта изображение в cas/ без готовых копий.
+    """
+    field_name, variants_name = IMAGE_FIELDS[type(instance)]
+    file = getattr(instance, field_name)
+    if not file or not is_content_addressed(file.name):
+        return False
+    variants = getattr(instance, variants_name) or {}
+    return variants.get("name") != file.name
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Пул процессов текущего процесса, создаётся при первом обращении.
+
+    Процессы запускаются через spawn: форк процесса с открытыми
+    соединениями и потоками сервера небезопасен.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.SHOP_THUMBNAIL_WORKERS,
+                mp_context=get_context("spawn"),
+            )
+        return _executor
+
+
+def schedule_variants(instance: models.Model) -> None:
+    """
+    Ставит построение копий изображения в пул после фиксации транзакции.
+    """
+    field_name, variants_name = IMAGE_FIELDS[type(instance)]
+    task = (type(instance), instance.pk, getattr(instance, field_name).name)
+    transaction.on_commit(partial(_submit, *task))
+
+
+def _submit(model: Type[models.Model], pk: int, name: str) -> None:
+    if (model, pk, name) in _pending:
+        return
+    field_name, variants_name = IMAGE_FIELDS[model]
+    storage = model._meta.get_field(field_name).storage
+    try:
+        with storage.open(name, "rb") as file:
+            data = file.read()
+        future = get_executor().submit(
+            render_variants, data, settings.SHOP_THUMBNAIL_WIDTHS
+        )
+    except Exception:
+        logger.exception(f"Не удалось запустить построение копий {name}")
+        return
+    _pending.add((model, pk, name))
+    future.add_done_callback(partial(_on_rendered, model, pk, name))
+
+
+def _on_rendered(
+        model: Type[models.Model], pk: int, name: str, future: Future
+) -> None:
+    # Выполняется в служебном потоке пула: соединение с базой
+    # этого потока закрывается после записи.
+    _pending.discard((model, pk, name))
+    try:
+        store_variants(model, pk, name, future.result())
+    except Exception:
+        logger.exception(f"Не удалось построить копии {name}")
+    finally:
+        connections.close_all()
+
+
+def store_variants(
+        model: Type[models.Model],
+        pk: int,
+        name: str,
+        rendered: List[RenderedVariant],
+) -> bool:
+    """
+    Сохраняет копии рядом с оригиналом и отмечает их в модели.
+
+    Returns:
+        False, если изображение успели заменить или удалить.
+
+    Raises:
+        ValueError: Оригинал не в cas/ или хранилище сохранило копию
+            под другим именем.
+    """
+    if not is_content_addressed(name):
+        raise ValueError(
+            f"Копии строятся только для файлов в cas/, {name}"
+            " нужно перенести командой migrate_media_storage"
+        )
+    field_name, variants_name = IMAGE_FIELDS[model]
+    storage = model._meta.get_field(field_name).storage
+    for width, original, webp in rendered:
+        for variant, content in (
+                (variant_name(name, width), original),
+                (variant_name(name, width, webp=True), webp),
+        ):
+            # Имя копии определяется оригиналом, поэтому без суффиксов.
+            storage.delete(variant)
+            saved = storage.save(variant, ContentFile(content))
+            if saved != variant:
+                raise ValueError(f"Копия {variant} сохранена как {saved}")
+
+    variants = {"name": name, "widths": [width for width, _, _ in rendered]}
+    updated = model.objects.filter(pk=pk, **{field_name: name}).update(
+        **{variants_name: variants}
+    )
+    if not updated:
+        return False
+    if model is Product:
+        product_id = pk
+    else:
+        product_id = (
+            ProductImage.objects
+            .filter(pk=pk)
+            .values_list("product_id", flat=True)
+            .first()
+        )
+    # Ссылки на копии входят в кэш товара, карточки и ETag.
+    Product.objects.filter(pk=product_id).update(updated_at=timezone.now())
+    evict_products([product_id])
+    logger.info(f"Построены копии {name}: {variants['widths']}")
+    return True
+
+
+def build_variants(
+        instances: List[models.Model],
+) -> List[Tuple[models.Model, bool]]:
+    """
+    Строит копии изображений пачкой в пуле и ждёт завершения.
+
+    Используется командой build_image_variants.
+
+    Returns:
+        Пары (объект, копии сохранены).
+    """
+    executor = get_executor()
+    futures = []
+    for instance in instances:
+        field_name, variants_name = IMAGE_FIELDS[type(instance)]
+        file = getattr(instance, field_name)
+        if not is_content_addressed(file.name):
+            logger.warning(
+                f"Пропущен {file.name}: файл не в cas/,"
+                " сначала нужна команда migrate_media_storage"
+            )
+            futures.append((instance, file.name, None))
+            continue
+        try:
+            with file.open("rb"):
+                data = file.read()
+        except OSError:
+            logger.exception(f"Не удалось прочитать {file.name}")
+            futures.append((instance, file.name, None))
+            continue
+        futures.append((
+            instance,
+            file.name,
+            executor.submit(
+                render_variants, data, settings.SHOP_THUMBNAIL_WIDTHS
+            ),
+        ))
+
+    results = []
+    for instance, name, future in futures:
+        stored = False
+        if future is not None:
+            try:
+                stored = store_variants(
+                    type(instance), instance.pk, name, future.result()
+                )
+            except Exception:
+                logger.exception(f"Не удалось построить копии {name}")
+        results.append((instance, stored))
+    return results
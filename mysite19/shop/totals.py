@@ -0,0 +1,108 @@
+"""
+Денормализованные итоги заказов.
+
+Order.total_price и Order.products_count хранятся в таблице заказов,
+чтобы списки, API и отчёты не соединяли заказы с товарами.
+Итоги поддерживаются сигналами (см. shop.signals); пути, которые
+сигналы не вызывают (bulk_create, update), пересчитывают их через
+refresh_order_totals().
+"""
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import (Count, DecimalField, F, IntegerField,
+                              OuterRef, QuerySet, Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Order
+
+OrderProduct = Order.products.through
+
+
+def order_total_price() -> Coalesce:
+    """
+    Подзапрос суммы цен товаров заказа из OuterRef("pk").
+    """
+    total = (
+        OrderProduct.objects
+        .filter(order_id=OuterRef("pk"))
+        .order_by()
+        .values("order_id")
+        .annotate(total=Sum("product__price"))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(total),
+        Value(Decimal(0)),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def order_products_count() -> Coalesce:
+    """
+    Подзапрос количества товаров заказа из OuterRef("pk").
+    """
+    count = (
+        OrderProduct.objects
+        .filter(order_id=OuterRef("pk"))
+        .order_by()
+        .values("order_id")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(count), Value(0), output_field=IntegerField())
+
+
+def refresh_order_totals(queryset: QuerySet) -> int:
+    """
+    Пересчитывает итоги заказов из queryset одним UPDATE.
+
+    Returns:
+        Количество обновлённых заказов.
+    """
+    return queryset.update(
+        total_price=order_total_price(),
+        products_count=order_products_count(),
+        updated_at=timezone.now(),
+    )
+
+
+def add_order_products(
+        orders: QuerySet, price: Decimal, count: int
+) -> int:
+    """
+    Увеличивает итоги заказов на стоимость и количество
+    добавленных товаров без пересчёта по связям.
+    """
+    return orders.update(
+        total_price=F("total_price") + price,
+        products_count=F("products_count") + count,
+        updated_at=timezone.now(),
+    )
+
+
+def shift_product_price(
+        product_id: int, old_price: Decimal, new_price: Decimal
+) -> int:
+    """
+    Переносит изменение цены товара в итоги заказов с этим товаром.
+    """
+    return Order.objects.filter(products=product_id).update(
+        total_price=F("total_price") + (new_price - old_price),
+        updated_at=timezone.now(),
+    )
+
+
+def orders_with_products(product_ids: Iterable[int]) -> QuerySet:
+    """
+    Заказы, содержащие хотя бы один из товаров.
+    """
+    return Order.objects.filter(
+        pk__in=(
+            OrderProduct.objects
+            .filter(product_id__in=list(product_ids))
+            .values("order_id")
+        )
+    )
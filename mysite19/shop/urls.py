@@ -9,19 +9,23 @@ CRUD операции для продуктов и заказов.
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (GroupsList, LatestProductsFeed, OrderCreateView,
-                    OrderDeleteView, OrderDetailView, OrdersListView,
+from .views import (DailySalesViewSet, GroupsList, LatestProductsFeed,
+                    MonthlySalesViewSet, OrderCreateView, OrderDeleteView,
+                    OrderDetailView, OrdersListView,
                     OrdersOwnerDataExportView, OrderUpdateView, OrderViewSet,
-                    ProductCreateView, ProductDeleteView, ProductDetailsView,
+                    ProductAutocompleteView, ProductCreateView,
+                    ProductDeleteView, ProductDetailsView,
                     ProductsDataExportView, ProductsListView,
                     ProductUpdateView, ProductViewSet, ShopIndex,
-                    UserOrderListView)
+                    UserAutocompleteView, UserOrderListView)
 
 app_name = "shop"
 
 routers = DefaultRouter()
 routers.register("products", ProductViewSet)
 routers.register("orders", OrderViewSet)
+routers.register("sales/daily", DailySalesViewSet)
+routers.register("sales/monthly", MonthlySalesViewSet)
 
 urlpatterns = [
     path("", ShopIndex.as_view(), name="index"),
@@ -70,6 +74,16 @@ urlpatterns = [
         name="product_archive"
     ),
     path("orders/create/", OrderCreateView.as_view(), name="create_order"),
+    path(
+        "orders/autocomplete/products/",
+        ProductAutocompleteView.as_view(),
+        name="product_autocomplete",
+    ),
+    path(
+        "orders/autocomplete/users/",
+        UserAutocompleteView.as_view(),
+        name="user_autocomplete",
+    ),
     path("orders/<int:pk>", OrderDetailView.as_view(), name="order_details"),
     path(
         "orders/<int:pk>/update",
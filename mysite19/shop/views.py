@@ -1,42 +1,76 @@
 """Представления моделей интернет магазина"""
 
 # import logging
-from csv import DictWriter
-from typing import Any, Optional
+from functools import partial
+from typing import Any, Optional, Set
 
+from django.conf import settings
 from django.contrib.auth.mixins import (LoginRequiredMixin,
                                         PermissionRequiredMixin,
                                         UserPassesTestMixin)
 from django.contrib.auth.models import Group, User
-from django.contrib.syndication.views import Feed
 from django.core.cache import cache
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.db.models import Prefetch, QuerySet, Sum
+from django.db.models.functions import Left
+from django.http import (HttpRequest, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.http.response import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.urls import reverse_lazy
-from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import get_language
 from django.views import View
-from django.views.decorators.cache import cache_page
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
                                   UpdateView)
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import OpenApiResponse, extend_schema
 from loguru import logger
 from rest_framework.decorators import action
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.parsers import MultiPartParser
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from .common import save_csv_products
+from mysite19.cache_versions import get_version, get_versions
+from mysite19.feeds import CachedFeed
+
+from .autocomplete import search_products, search_users
+from .common import iter_csv_rows, save_csv_products
+from .conditional import conditional, make_etag, object_validators
 from .forms import GroupForm, OrderForm, ProductForm
-from .models import Order, Product, ProductImage
-from .serializers import OrderSerializer, ProductSerializer
+from .fragments import render_fragments
+from .models import DailySales, MonthlySales, Order, Product, ProductImage
+from .pagination import KeysetListMixin, KeysetPagination
+from .product_cache import (fill_product_cache, get_cached_product,
+                            get_cached_products, get_product_cache_stats,
+                            get_product_list, product_list_cache_key,
+                            set_product_list)
+from .search import OrderSearchFilter, ProductSearchFilter
+from .serializers import (DailySalesSerializer, MonthlySalesSerializer,
+                          OrderSerializer, ProductImportSerializer,
+                          ProductSerializer)
 
 # log = logging.getLogger(__name__)
 
+def order_list_queryset() -> QuerySet:
+    """
+    Заказы для списков: сохранённые итоги (products_count,
+    total_price) вместо подсчёта по связям и только показываемые
+    поля товаров.
+    """
+    return (
+        Order.objects
+        .select_related("user")
+        .prefetch_related(Prefetch(
+            "products",
+            queryset=Product.objects.only("pk", "name", "price"),
+        ))
+        .order_by("-pk")
+    )
+
+
 class OrdersOwnerDataExportView(View):
     """
     Представление для экспорта заказов.
@@ -59,9 +93,31 @@ class OrdersOwnerDataExportView(View):
         Обрабатывает GET-запрос.
 
         Возвращает JSON с данными заказов пользователя.
-        Кэширует результат на 300 секунд.
+        Кэш действует, пока не изменятся заказы владельца или товары.
+        Неизменённая выгрузка отдаётся ответом 304 по If-None-Match.
+        """
+        orders_version, products_version = get_versions(
+            ("orders", self.owner.id), ("products",)
+        )
+        # Версии меняются при любом изменении данных выгрузки,
+        # поэтому ETag не требует запроса к базе.
+        validators = (make_etag(orders_version, products_version), None)
+        return conditional(
+            request,
+            validators,
+            partial(self.render_export, orders_version, products_version),
+        )
+
+    def render_export(
+            self, orders_version: int, products_version: int
+    ) -> JsonResponse:
         """
-        cache_key = f"orders_owner_export_{self.owner.id}"
+        Выгрузка заказов владельца из кэша или из базы.
+        """
+        cache_key = (
+            f"orders_owner_export:{self.owner.id}:"
+            f"{orders_version}:{products_version}"
+        )
         orders_data = cache.get(cache_key)
         if orders_data is None:
             orders = (
@@ -90,14 +146,23 @@ class OrdersOwnerDataExportView(View):
                 }
                 for order in orders
             ]
-        cache.set(cache_key, orders_data, 300)
+            cache.set(
+                cache_key, orders_data, settings.SHOP_EXPORT_CACHE_TIMEOUT
+            )
         return JsonResponse({"orders": orders_data})
 
 
-class UserOrderListView(LoginRequiredMixin, ListView):
-    """Список заказов конкретного пользователя."""
+class UserOrderListView(LoginRequiredMixin, KeysetListMixin, ListView):
+    """
+    Список заказов конкретного пользователя по страницам.
+
+    Страницы выбираются по id (новые первыми) без OFFSET и COUNT(*).
+    Страница кэшируется фрагментом шаблона по курсору, размеру
+    и версиям заказов владельца и товаров.
+    """
     model = Order
     template_name = "shop/user_orders.html"
+    keyset_descending = True
 
     def setup(self, request, *args, **kwargs):
         super().setup(request, *args, **kwargs)
@@ -105,41 +170,51 @@ class UserOrderListView(LoginRequiredMixin, ListView):
         self.owner = get_object_or_404(User, id=user_id)
 
     def get_queryset(self):
-        return (Order.objects
-                .filter(user=self.owner)
-                .select_related("user")
-                .prefetch_related("products"))
+        return (order_list_queryset()
+                .filter(user=self.owner))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        orders_version, products_version = get_versions(
+            ("orders", self.owner.id), ("products",)
+        )
         context.update({
             "owner": self.owner,
             "order_verbose_name": Order._meta.verbose_name,
             "orders_verbose_name": Order._meta.verbose_name_plural,
+            "orders_version": orders_version,
+            "products_version": products_version,
         })
         logger.debug(f"Открыты заказы {self.owner.username}")
         return context
 
 
-class LatestProductsFeed(Feed):
+class LatestProductsFeed(CachedFeed):
     title = "The latest receipts of goods"
     description = "The latest and most delicious products"
     link = reverse_lazy("shop:products")
+    version_group = ("products",)
+    items_count = settings.SHOP_FEED_ITEMS
 
     def items(self):
-        return Product.objects.filter(archived=False).order_by("-created_at")[:5]
+        return (
+            Product.objects
+            .filter(archived=False)
+            .annotate(description_short=Left("description", 100))
+            .only("pk", "name", "created_at")
+            .order_by("-created_at")[:self.items_count]
+        )
 
     def item_title(self, item: Product):
         return item.name
 
     def item_description(self, item: Product):
-        return item.description[:100]
+        return item.description_short
 
     def item_pubdate(self, item: Product):
         return item.created_at
 
 
-
 @extend_schema(description="Order views CRUD")
 class OrderViewSet(ModelViewSet):
     """
@@ -148,10 +223,15 @@ class OrderViewSet(ModelViewSet):
     Полный CRUD для сущности заказа.
     """
 
-    queryset = Order.objects.all()
+    # Поле products сериализуется списком pk: одна выборка по таблице
+    # связи на страницу вместо запроса на каждый заказ.
+    queryset = Order.objects.prefetch_related(
+        Prefetch("products", queryset=Product.objects.only("pk"))
+    )
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
     filter_backends = [
-        SearchFilter,
+        OrderSearchFilter,
         DjangoFilterBackend,
         OrderingFilter,
     ]
@@ -167,6 +247,133 @@ class OrderViewSet(ModelViewSet):
         "created_at",
     ]
 
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Заказ с поддержкой If-None-Match / If-Modified-Since.
+
+        Неизменённый заказ стоит одного запроса по первичному ключу.
+        """
+        pk = self.kwargs[self.lookup_field]
+        updated_at = (
+            self.get_queryset()
+            .filter(pk=pk)
+            .values_list("updated_at", flat=True)
+            .first()
+        ) if pk.isdigit() else None
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional(
+            request,
+            object_validators(updated_at),
+            partial(super().retrieve, request, *args, **kwargs),
+        )
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Список заказов с поддержкой If-None-Match.
+
+        ETag строится из версий всех заказов и каталога (итоги заказов
+        зависят от цен) и адреса запроса, поэтому проверка не требует
+        запроса к базе.
+        """
+        orders_version, products_version = get_versions(
+            ("orders",), ("products",)
+        )
+        etag = make_etag(
+            orders_version, products_version, request.get_full_path()
+        )
+        return conditional(
+            request,
+            (etag, None),
+            partial(super().list, request, *args, **kwargs),
+        )
+
+
+class SalesRollupViewSet(ReadOnlyModelViewSet):
+    """
+    Базовый ViewSet для витрин продаж (только чтение).
+
+    Атрибут period_field - поле периода витрины.
+    """
+
+    period_field = None
+    permission_classes = [IsAdminUser]
+    pagination_class = KeysetPagination
+    filter_backends = [
+        DjangoFilterBackend,
+        OrderingFilter,
+    ]
+
+    @extend_schema(
+        description="Orders count and revenue per period"
+                    " for the filtered rows",
+    )
+    @action(methods=["get"], detail=False)
+    def summary(self, request: Request) -> Response:
+        """
+        Итоги по периодам с учётом фильтров (товар, покупатель, даты).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = (
+            queryset
+            .order_by()
+            .values(self.period_field)
+            .annotate(
+                total_orders=Sum("orders_count"),
+                total_revenue=Sum("revenue"),
+            )
+            .order_by(self.period_field)
+        )
+        return Response([
+            {
+                self.period_field: row[self.period_field],
+                "orders_count": row["total_orders"],
+                # Как DecimalField сериализаторов: строкой, без потери точности.
+                "revenue": f"{row['total_revenue']:.2f}",
+            }
+            for row in rows
+        ])
+
+
+@extend_schema(description="Daily sales rollup, read only")
+class DailySalesViewSet(SalesRollupViewSet):
+    """
+    Продажи по дням, товарам и покупателям.
+    """
+
+    period_field = "day"
+    queryset = DailySales.objects.all()
+    serializer_class = DailySalesSerializer
+    filterset_fields = {
+        "day": ["exact", "gte", "lte"],
+        "product": ["exact"],
+        "user": ["exact"],
+    }
+    ordering_fields = [
+        "day",
+    ]
+    ordering = ["-day"]
+
+
+@extend_schema(description="Monthly sales rollup, read only")
+class MonthlySalesViewSet(SalesRollupViewSet):
+    """
+    Продажи по месяцам, товарам и покупателям.
+    """
+
+    period_field = "month"
+    queryset = MonthlySales.objects.all()
+    serializer_class = MonthlySalesSerializer
+    filterset_fields = {
+        "month": ["exact", "gte", "lte"],
+        "product": ["exact"],
+        "user": ["exact"],
+    }
+    ordering_fields = [
+        "month",
+    ]
+    ordering = ["-month"]
+
 
 @extend_schema(description="Product views CRUD")
 class ProductViewSet(ModelViewSet):
@@ -178,8 +385,9 @@ class ProductViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
     filter_backends = [
-        SearchFilter,
+        ProductSearchFilter,
         DjangoFilterBackend,
         OrderingFilter,
     ]
@@ -196,7 +404,9 @@ class ProductViewSet(ModelViewSet):
         "name",
         "price",
         "discount",
+        "created_at",
     ]
+    ordering = ["name"]
 
     @extend_schema(
         summary="Get one product by ID",
@@ -208,52 +418,177 @@ class ProductViewSet(ModelViewSet):
             ),
         }
     )
-    @method_decorator(cache_page(30))
-    def retrieve(self, *args, **kwargs):
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Товар из кэша представлений (shop.product_cache).
+
+        При промахе товар читается из базы и кладётся в кэш.
+        Попадание отдаётся без get_object(): фильтры списка к одному
+        товару не применяются, а объектных прав у ProductViewSet нет
+        (только IsAuthenticated). Если они появятся, проверку
+        check_object_permissions нужно выполнять и для попаданий.
+        """
         logger.debug("Привет получение продукта")
-        return super().retrieve(*args, **kwargs)
+        pk = self.kwargs[self.lookup_field]
+        data = get_cached_product(pk) if pk.isdigit() else None
+        if data is None:
+            data = fill_product_cache(self.get_object())
+        validators = object_validators(parse_datetime(data["updated_at"]))
+        return conditional(
+            request,
+            validators,
+            lambda: Response(self.absolute_preview(request, data)),
+        )
 
-    @method_decorator(cache_page(30))
-    def list(self, *args, **kwargs):
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Список товаров с поддержкой If-None-Match.
+
+        ETag строится из версии каталога и канонического ключа
+        параметров запроса: неизменённая страница стоит одного
+        обращения к кэшу и ни одного SQL-запроса.
+        """
         logger.debug("Привет список продуктов")
-        return super().list(*args, **kwargs)
+        key = product_list_cache_key(
+            request.query_params, self.list_query_params()
+        )
+        version, entry = get_product_list(key)
+        return conditional(
+            request,
+            (make_etag(version, key), None),
+            partial(self.cached_list, request, key, version, entry),
+        )
 
+    def list_query_params(self) -> Set[str]:
+        """
+        Имена параметров запроса, которые читают фильтры и пагинатор.
+        """
+        paginator = self.paginator
+        names = {
+            paginator.cursor_query_param,
+            paginator.page_size_query_param,
+        }
+        for backend_class in self.filter_backends:
+            backend = backend_class()
+            if isinstance(backend, DjangoFilterBackend):
+                filterset_class = backend.get_filterset_class(
+                    self, self.get_queryset()
+                )
+                names.update(filterset_class.base_filters)
+            for attr in ("search_param", "ordering_param"):
+                if hasattr(backend, attr):
+                    names.add(getattr(backend, attr))
+        return names
+
+    def cached_list(
+            self, request: Request, key: str, version: int,
+            entry: Optional[dict],
+    ) -> Response:
+        """
+        Список товаров с кэшем страниц (shop.product_cache).
+
+        Кэшируются только pk товаров страницы, строки берутся
+        из кэша товаров.
+        """
+        paginator = self.paginator
+        if entry is not None:
+            paginator.restore_page_state(request, entry["page"])
+            pks = entry["pks"]
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            field, _ = paginator.get_ordering(request, queryset, self)
+            page = paginator.paginate_queryset(
+                queryset.values("pk", field), request, view=self
+            )
+            pks = [row["pk"] for row in page]
+            set_product_list(key, version, pks, paginator.get_page_state())
+
+        products = get_cached_products(pks)
+        data = []
+        for pk in pks:
+            if pk not in products:
+                continue
+            data.append(self.absolute_preview(request, products[pk]))
+        return paginator.get_paginated_response(data)
+
+    def absolute_preview(self, request: Request, data: dict) -> dict:
+        """
+        Копия представления из кэша с абсолютными ссылками на превью
+        и его копии.
+        """
+        data = dict(data)
+        if data["preview"]:
+            data["preview"] = request.build_absolute_uri(data["preview"])
+        data["preview_variants"] = [
+            {
+                **variant,
+                "url": request.build_absolute_uri(variant["url"]),
+                "webp": request.build_absolute_uri(variant["webp"]),
+            }
+            for variant in data["preview_variants"]
+        ]
+        return data
+
+    @extend_schema(
+        description="Hit and miss counters of the product cache",
+    )
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="cache-stats",
+        permission_classes=[IsAdminUser],
+    )
+    def cache_stats(self, request: Request) -> Response:
+        return Response(get_product_cache_stats())
 
     @action(methods=["get"], detail=False)
     def download_csv(self, request: Request):
-        response = HttpResponse(content_type="text/csv")
+        """
+        Потоковая выгрузка отфильтрованных товаров в CSV.
+
+        Строки отдаются клиенту по мере чтения из базы,
+        память воркера не зависит от размера каталога.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = {
+            "sku": "sku",
+            "name": "name",
+            "description": "description",
+            "price": "price",
+            "discount": "discount",
+            "created_by": "created_by__username",
+        }
+        response = StreamingHttpResponse(
+            iter_csv_rows(queryset, columns),
+            content_type="text/csv",
+        )
         filename = "products_export.csv"
         response["Content-Disposition"] = f"attachment; filename={filename}"
-        queryset = self.filter_queryset(self.get_queryset())
-        fields = [
-            "name",
-            "description",
-            "price",
-            "discount",
-            "created_by",
-        ]
-        queryset = queryset.only(*fields)
-        writer = DictWriter(response, fieldnames=fields)
-        writer.writeheader()
-        for product in queryset:
-            writer.writerow({
-                field: getattr(product, field)
-                for field in fields
-            })
         return response
 
+    @extend_schema(
+        summary="Import products from CSV",
+        description="Streams the uploaded CSV in chunks. With **upsert** "
+                    "products with an existing sku are updated.",
+        request={"multipart/form-data": ProductImportSerializer},
+    )
     @action(detail=False, methods=["post"], parser_classes=[MultiPartParser])
     def upload_csv(self, request: Request):
-        file = request.FILES.get('file')
-        if not file:
-            return Response({"detail": "No file uploaded."}, status=400)
-        products = save_csv_products(
-            file.file,
+        """
+        Импорт товаров из CSV.
+
+        Возвращает итоги импорта вместо списка созданных товаров.
+        """
+        serializer = ProductImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        summary = save_csv_products(
+            serializer.validated_data["file"].file,
             encoding=request.encoding or "utf-8",
             user=request.user,
+            upsert=serializer.validated_data["upsert"],
         )
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        return Response(summary)
 
 
 class ProductCreateView(UserPassesTestMixin, CreateView):
@@ -292,6 +627,30 @@ class ProductDetailsView(DetailView):
     queryset = Product.objects.prefetch_related("images")
     context_object_name = "product"
 
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        """
+        Страница товара с поддержкой условных запросов.
+
+        Страница зависит от пользователя (ссылки редактирования)
+        и языка, поэтому они входят в ETag.
+        """
+        updated_at = (
+            Product.objects
+            .filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return super().get(request, *args, **kwargs)
+        validators = object_validators(
+            updated_at, request.user.pk, get_language()
+        )
+        return conditional(
+            request,
+            validators,
+            partial(super().get, request, *args, **kwargs),
+        )
+
 
 class ProductUpdateView(UserPassesTestMixin, UpdateView):
     """
@@ -348,17 +707,33 @@ class ProductDeleteView(DeleteView):
         return HttpResponseRedirect(success_url)
 
 
-class ProductsListView(ListView):
-    """Список активных товаров."""
+class ProductsListView(KeysetListMixin, ListView):
+    """
+    Список активных товаров по страницам.
+
+    Страницы выбираются по ключу (name, id) без OFFSET, количество
+    считается не дальше products_count_limit строк. Карточки
+    товаров кэшируются по pk и updated_at и читаются одним
+    get_many на страницу.
+    """
 
     model = Product
     template_name = "shop/products-list.html"
     context_object_name = "products"
+    keyset_field = "name"
+    products_count_limit = 1000
 
     def get_queryset(self) -> Any:
         """Получить только неархивированные продукты."""
         return Product.objects.filter(archived=False)
 
+    def get_products_count(self) -> int:
+        """
+        Количество товаров, но не больше products_count_limit + 1.
+        """
+        limit = self.products_count_limit
+        return self.get_queryset().order_by()[:limit + 1].count()
+
     def get_context_data(self, **kwargs: Any) -> dict:
         """
         Добавить в контекст имена модели во
@@ -368,6 +743,16 @@ class ProductsListView(ListView):
         context = super().get_context_data(**kwargs)
         context["product_verbose_name"] = Product._meta.verbose_name
         context["products_verbose_name"] = Product._meta.verbose_name_plural
+        context["products_count"] = self.get_products_count()
+        context["products_count_limit"] = self.products_count_limit
+        context["product_cards"] = render_fragments(
+            "shop/product-card.html",
+            context["products"],
+            key_parts=lambda product: (
+                product.pk, product.updated_at.timestamp()
+            ),
+            context_name="product",
+        )
         logger.debug("Открыт список продуктов")
         return context
 
@@ -392,11 +777,19 @@ class OrderCreateView(UserPassesTestMixin, CreateView):
     template_name = "shop/order_form.html"
 
 
-class OrdersListView(LoginRequiredMixin, ListView):
-    """Список заказов с оптимизацией запросов."""
+class OrdersListView(LoginRequiredMixin, KeysetListMixin, ListView):
+    """
+    Список заказов по страницам с оптимизацией запросов.
 
-    queryset = (Order.objects.select_related("user")
-                .prefetch_related("products"))
+    Страницы выбираются по id (новые первыми) без OFFSET и COUNT(*).
+    Число запросов на страницу не зависит от числа заказов:
+    страница, пользователи и товары страницы.
+    """
+
+    keyset_descending = True
+
+    def get_queryset(self) -> Any:
+        return order_list_queryset()
 
     def get_context_data(self, **kwargs: Any) -> dict:
         """
@@ -461,6 +854,34 @@ class OrderDeleteView(DeleteView):
     success_url = reverse_lazy("shop:orders")
 
 
+class PrefixAutocompleteView(UserPassesTestMixin, View):
+    """
+    Поиск по началу строки для виджетов формы заказа.
+
+    Отвечает в формате django_select2: {"results": [...], "more": false}.
+    Возвращаются только первые результаты, уточнение - дальнейшим вводом.
+    """
+
+    def test_func(self) -> bool:
+        """Искать может тот, кто создаёт или изменяет заказы."""
+        user = self.request.user
+        return user.has_perm("shop.add_order") or user.has_perm(
+            "shop.change_order"
+        )
+
+    def get(self, request: HttpRequest) -> JsonResponse:
+        results = self.search(request.GET.get("term", ""))
+        return JsonResponse({"results": results, "more": False})
+
+
+class ProductAutocompleteView(PrefixAutocompleteView):
+    search = staticmethod(search_products)
+
+
+class UserAutocompleteView(PrefixAutocompleteView):
+    search = staticmethod(search_users)
+
+
 class ShopIndex(View):
     """
     Главная страница магазина с основными ссылками.
@@ -510,20 +931,22 @@ class GroupsList(View):
 
 
 class ProductsDataExportView(View):
+    """
+    Экспорт всех товаров в JSON.
+
+    Кэш действует, пока не изменится хотя бы один товар.
+    """
+
     def get(self, request: HttpRequest) -> JsonResponse:
-        cache_key = "products_data_export"
-        products = Product.objects.order_by('pk').all()
+        cache_key = f"products_data_export:{get_version('products')}"
         products_data = cache.get(cache_key)
         if products_data is None:
-            products_data = [
-                {
-                    "pk": product.pk,
-                    "name": product.name,
-                    "price": product.price,
-                    "created_at": product.created_at,
-                    "archived": product.archived,
-                }
-                for product in products
-            ]
-        cache.set(cache_key, products_data, 300)
+            products_data = list(
+                Product.objects
+                .order_by("pk")
+                .values("pk", "name", "price", "created_at", "archived")
+            )
+            cache.set(
+                cache_key, products_data, settings.SHOP_EXPORT_CACHE_TIMEOUT
+            )
         return JsonResponse({"products": products_data})